@@ -0,0 +1,54 @@
+import os
+import sys
+import subprocess
+import tempfile
+import statistics
+import argparse
+
+#root directory of the API, containing index.py
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#code executed in a fresh interpreter to simulate a serverless cold start, timing the dataset loading only
+COLD_START_CODE = """
+import time
+import index
+start = time.perf_counter()
+index.get_all_subdivisions()
+index.get_all_subdivision_codes()
+index.get_alpha2_codes()
+print(time.perf_counter() - start)
+"""
+
+def cold_start(snapshot_path: str) -> float:
+    """ Run a cold start of the API dataset loading in a new process, returning the elapsed seconds. """
+    env = dict(os.environ, ISO3166_2_SNAPSHOT=snapshot_path)
+    output = subprocess.run([sys.executable, "-c", COLD_START_CODE], cwd=API_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return float(output.stdout.strip().splitlines()[-1])
+
+def main() -> None:
+    """ Compare cold start loading via the Subdivisions class against the prebuilt binary snapshot. """
+    parser = argparse.ArgumentParser(description="Cold start benchmark of the ISO 3166-2 API dataset loading.")
+    parser.add_argument("--runs", type=int, default=10, help="number of cold starts per loading path.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, API_DIR)
+    import index
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_path = index.build_snapshot(os.path.join(tmp_dir, "iso3166-2.snapshot"))
+        missing_path = os.path.join(tmp_dir, "missing.snapshot")
+
+        results = {
+            "Subdivisions()": [cold_start(missing_path) for _ in range(args.runs)],
+            "snapshot": [cold_start(snapshot_path) for _ in range(args.runs)],
+        }
+
+    print(f"Cold start dataset loading, iso3166-2 v{index.iso3166_2_version}, {args.runs} runs each:")
+    for path, timings in results.items():
+        print(f"  {path:<16} median={statistics.median(timings) * 1000:8.2f}ms  min={min(timings) * 1000:8.2f}ms  max={max(timings) * 1000:8.2f}ms")
+    speedup = statistics.median(results["Subdivisions()"]) / statistics.median(results["snapshot"])
+    print(f"  snapshot speedup: {speedup:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import os
+import sys
+import timeit
+import argparse
+
+#root directory of the API, containing index.py
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, API_DIR)
+
+import index
+
+#endpoints benchmarked under each JSON provider
+ENDPOINTS = ["/api/all", "/api/all?limit=250", "/api/alpha/FR,DE,GB,US", "/api/all?format=geojson"]
+
+def clear_serialization_caches() -> None:
+    """ Clear the pre-serialized response caches so each request pays the full serialization cost. """
+    index.get_all_response_cache.cache_clear()
+    index.get_country_fragment.cache_clear()
+
+def main() -> None:
+    """ Compare the request latency of the main JSON endpoints under the stdlib json and orjson providers. """
+    parser = argparse.ArgumentParser(description="Benchmark of the ISO 3166-2 API JSON providers.")
+    parser.add_argument("--runs", type=int, default=20, help="number of requests per endpoint and provider.")
+    args = parser.parse_args()
+
+    providers = {"json": index.StdlibJSONProvider(index.app)}
+    if index.orjson is not None:
+        providers["orjson"] = index.OrjsonProvider(index.app)
+    else:
+        print("orjson is not installed, only benchmarking the stdlib json provider.")
+
+    client = index.app.test_client()
+    index.get_all_subdivisions()
+
+    print(f"Uncached request latency, {args.runs} runs each:")
+    for endpoint in ENDPOINTS:
+        timings = {}
+        for name, provider in providers.items():
+            index.app.json = provider
+            def request():
+                clear_serialization_caches()
+                client.get(endpoint)
+            timings[name] = min(timeit.repeat(request, number=1, repeat=args.runs))
+        summary = "  ".join(f"{name}={timing * 1000:8.2f}ms" for name, timing in timings.items())
+        print(f"  {endpoint:<28} {summary}")
+
+if __name__ == '__main__':
+    main()
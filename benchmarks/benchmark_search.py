@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import random
+import statistics
+import argparse
+from unittest import mock
+
+#root directory of the API, containing index.py
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_search_terms(names: list[str], count: int, seed: int) -> str:
+    """ Return a comma separated search input of subdivision names each with a single character typo, so they're fuzzy matched. """
+    rng = random.Random(seed)
+    terms = []
+    for name in rng.sample(names, count):
+        position = rng.randrange(len(name))
+        terms.append(name[:position] + rng.choice("aeiou") + name[position + 1:])
+    return ",".join(terms)
+
+def time_search(search_func, search_input: str, likeness: int, runs: int) -> list[float]:
+    """ Time the search function over the number of runs, returning the elapsed seconds of each. """
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        search_func(search_input, likeness)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main() -> None:
+    """ Compare /api/search latency for 1, 10 and 100 search terms via Subdivisions.search, per-term scoring and batch scoring. """
+    parser = argparse.ArgumentParser(description="Multi-term search benchmark of the ISO 3166-2 API.")
+    parser.add_argument("--runs", type=int, default=3, help="number of runs per search input.")
+    parser.add_argument("--likeness", type=int, default=80, help="likeness score of the searches.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, API_DIR)
+    import index
+
+    names = sorted({subdiv_data["name"] for subdivisions in index.get_all_subdivisions().values() for subdiv_data in subdivisions.values()
+                    if "," not in subdiv_data["name"] and "'" not in subdiv_data["name"]})
+    index.get_search_index()
+
+    def per_term_search(search_input: str, likeness: int):
+        with mock.patch.object(index, "numpy", None):
+            return index.search_subdivisions(search_input, likeness_score=likeness)
+
+    search_funcs = {
+        "Subdivisions.search": lambda search_input, likeness: index.get_subdivision_instance().search(search_input, likeness_score=likeness, local_other_name_search=True),
+        "per-term scoring": per_term_search,
+        "batch scoring": lambda search_input, likeness: index.search_subdivisions(search_input, likeness_score=likeness),
+    }
+    if index.numpy is None:
+        del search_funcs["batch scoring"]
+        print("numpy not installed, batch scoring unavailable.")
+
+    print(f"Search latency, likeness={args.likeness}, {args.runs} runs each:")
+    for count in (1, 10, 100):
+        search_input = make_search_terms(names, count, seed=count)
+        for label, search_func in search_funcs.items():
+            timings = time_search(search_func, search_input, args.likeness, args.runs)
+            print(f"  {count:>3} terms  {label:<20} median={statistics.median(timings) * 1000:9.2f}ms  min={min(timings) * 1000:9.2f}ms")
+
+if __name__ == '__main__':
+    main()
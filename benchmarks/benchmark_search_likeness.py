@@ -0,0 +1,58 @@
+import os
+import sys
+import time
+import random
+import statistics
+import argparse
+from unittest import mock
+
+#root directory of the API, containing index.py
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#likeness scores swept by the benchmark, from exact matches down to loose fuzzy matches
+LIKENESS_SCORES = (100, 95, 90, 85, 80, 70, 60, 50)
+
+def make_search_terms(names: list[str], count: int, seed: int) -> list[str]:
+    """ Return normalized subdivision names each with a single character typo, so they're fuzzy matched. """
+    rng = random.Random(seed)
+    terms = []
+    for name in rng.sample(names, count):
+        position = rng.randrange(len(name))
+        terms.append(name[:position] + rng.choice("aeiou") + name[position + 1:])
+    return terms
+
+def time_search(index, terms: list[str], likeness: int, min_likeness: int, runs: int) -> list[float]:
+    """ Time uncached single term searches of every term over the number of runs, with the BK-tree used from min_likeness, returning the mean seconds per search of each run. """
+    timings = []
+    with mock.patch.object(index, "SEARCH_BKTREE_MIN_LIKENESS", min_likeness):
+        for _ in range(runs):
+            start = time.perf_counter()
+            for term in terms:
+                index.search_cache.clear()
+                index.search_subdivisions(term, likeness_score=likeness)
+            timings.append((time.perf_counter() - start) / len(terms))
+    return timings
+
+def main() -> None:
+    """ Compare /api/search latency from a likeness of 100 down to 50 with candidate names from the n-gram index against the BK-tree. """
+    parser = argparse.ArgumentParser(description="Search likeness sweep benchmark of the ISO 3166-2 API.")
+    parser.add_argument("--runs", type=int, default=3, help="number of runs per likeness score.")
+    parser.add_argument("--terms", type=int, default=50, help="number of search terms per run.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, API_DIR)
+    import index
+
+    names = [name for name in index.get_search_index()["exact"] if 3 < len(name) < 40]
+    terms = make_search_terms(sorted(names), args.terms, seed=args.terms)
+    index.get_search_bktree()
+
+    print(f"Search latency per term, {args.terms} terms, {args.runs} runs each (BK-tree used from likeness {index.SEARCH_BKTREE_MIN_LIKENESS} by default):")
+    for likeness in LIKENESS_SCORES:
+        ngram_timings = time_search(index, terms, likeness, 101, args.runs)
+        bktree_timings = time_search(index, terms, likeness, 0, args.runs)
+        print(f"  likeness={likeness:>3}  n-gram index median={statistics.median(ngram_timings) * 1000:7.2f}ms  "
+              f"BK-tree median={statistics.median(bktree_timings) * 1000:7.2f}ms")
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,52 @@
-from flask import Flask, request, render_template, jsonify, send_from_directory, Response
+from flask import Flask, request, render_template, jsonify, send_from_directory, Response, has_request_context
+from flask.json.provider import DefaultJSONProvider
 from urllib.parse import unquote_plus, unquote
-from iso3166_2 import Subdivisions
+from iso3166_2 import Subdivisions, __version__ as iso3166_2_version
 import re
 import os
+import sys
+import pickle
 import csv
-import io
 import json
+import gzip
+import base64
+import hashlib
 import requests
 from pycountry import countries, languages as pycountry_languages
-from thefuzz import process
+from thefuzz import process, fuzz, utils as fuzz_utils
+from rapidfuzz import process as rapidfuzz_process, fuzz as rapidfuzz_fuzz
+from rapidfuzz.distance import Indel
 import random
+import heapq
+import threading
+import time
 from unidecode import unidecode
-from functools import lru_cache
+from functools import lru_cache, wraps
+from collections import OrderedDict, Counter
+from bisect import bisect_left
 from math import radians, sin, cos, sqrt, atan2, ceil
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 
 ########################################################### Endpoints ###########################################################
 '''
@@ -24,12 +58,14 @@ from math import radians, sin, cos, sqrt, atan2, ceil
 /api/country_name/<input_country_name> - return all subdivision data for input country using its country name                        
 /api/search/<input_search_term> - return all subdivision data for input subdivision name or search term    
 /api/list_subdivisions/<input_alpha_code> - return all subdivision codes for ALL or a subset of countries
+/api/languages/<input_alpha_code> - return the local/other name languages for ALL or a subset of countries
 /api/coords - return subdivision data for input latitude and longitude coordinates
 /api/random - return a random subdivision from the dataset
 /api/stats - return statistics about the ISO 3166-2 dataset
 /api/version - get current version of iso3166-2 package being used by the API (mainly for dev)
 /api/clear-cache - clear the cached Subdivisions class instance and all cached subdivision data (mainly for dev)
 /api/search_geo/<input_latlng> - search subdivision data by approximate lat/lng (latLng attribute)
+/api/sync - return only the countries whose subdivision data changed, compared to the client's content hashes (POST) or version (GET)
 '''
 #################################################################################################################################
 
@@ -48,25 +84,165 @@ excludeMatchScore - this allows you to exclude the matchScore attribute from the
 The match score is the % of a match each returned subdivision data object is to the search terms, with 100% being an exact match. By 
 default the match score is returned for each object, e.g /api/search/Bucharest?excludeMatchScore=1, 
 /api/search/Oregon?excludeMatchScore=1 (default=0).
-format (?format=json|csv|geojson) - output format for the response. Default is json. csv returns a downloadable CSV file with one 
-row per subdivision. geojson returns a GeoJSON FeatureCollection (lat/lng stored as Point geometry). Supported on /api/all, 
-/api/alpha, /api/subdivision, /api/search and /api/country_name.
+format (?format=json|csv|geojson|ndjson|arrow|parquet) - output format for the response. Default is json. csv returns a downloadable 
+CSV file with one row per subdivision. geojson returns a GeoJSON FeatureCollection (lat/lng stored as Point geometry). ndjson returns 
+a streamed newline delimited JSON response with one flat record per subdivision, including its countryCode and subdivisionCode. arrow 
+and parquet return a typed, columnar Apache Arrow IPC or Parquet file with float lat/lng columns and a list column of history. The 
+full /api/all file is prebuilt, other requests are only available if pyarrow is installed. Supported on /api/all, /api/alpha, /api/subdivision, /api/search and /api/country_name.
 lang (?lang=<ISO639code>) - filter the localOtherName attribute to only include entries in the specified ISO 639 language, e.g 
 /api/all?lang=fra, /api/alpha/DE?lang=deu. Supported on all data endpoints.
 page (?page=N) - page number for paginated /api/all responses (1-indexed, default=1). Only active when ?page or ?pageSize is set.
-pageSize (?pageSize=N) - number of countries per page for paginated /api/all responses (1-250, default=50).
+pageSize (?pageSize=N) - number of countries per page for paginated /api/all responses, or subdivisions per page when using the 
+cursor parameter (1-250, default=50).
+encoding (?encoding=columnar) - return JSON responses in a compact columnar encoding, with one header row of column names followed 
+by one row array per subdivision. type values are indexes into the dictionaries.type list and flags are relative to flagBaseUrl. 
+Supported on /api/all, /api/alpha, /api/subdivision, /api/search and /api/country_name, e.g /api/all?encoding=columnar.
+cursor (?cursor=) - paginate /api/all by subdivision rather than by country, giving pages of a predictable size. Pass an empty 
+cursor for the first page then the nextCursor value of each page for the next, e.g /api/all?cursor=&pageSize=100. nextCursor is 
+null on the last page. Cursors are tied to the current dataset version.
+msgpack (?format=msgpack or Accept: application/msgpack) - return the same structure as the JSON output serialized as 
+MessagePack, for machine clients. Supported on all data endpoints, error and informational messages are always JSON.
+stream (?stream=1|0) - stream unpaginated JSON /api/all responses one country at a time using chunked transfer encoding, keeping 
+memory flat for full dataset downloads. Enabled by default when any query string parameter is set, e.g /api/all?filter=name, 
+/api/all?lang=fra&stream=1; set ?stream=0 to return the whole response at once.
 '''
 ###############################################################################################################################
 
+class StdlibJSONProvider(DefaultJSONProvider):
+    """ Flask's default JSON provider using the stdlib json module, with compact bytes serialization. """
+    def dumps_bytes(self, obj, sort_keys: bool|None=None) -> bytes:
+        """ Serialize object into compact JSON bytes, sorting the keys as jsonify does by default. """
+        return self.dumps(obj, separators=(",", ":"), sort_keys=self.sort_keys if sort_keys is None else sort_keys).encode("utf-8")
+
+class OrjsonProvider(StdlibJSONProvider):
+    """ 
+    High-speed JSON provider using orjson, falling back to the stdlib json module for any objects 
+    orjson can't serialize. Outputs the same JSON structure and key order as the default provider, 
+    with non-ASCII characters kept as UTF-8 rather than escaped. 
+    """
+    def dumps_bytes(self, obj, sort_keys: bool|None=None, indent: bool=False) -> bytes:
+        """ Serialize object into compact JSON bytes using orjson, sorting the keys as jsonify does by default. """
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys if sort_keys is None else sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            return super().dumps_bytes(obj, sort_keys)
+
+    def dumps(self, obj, **kwargs) -> str:
+        """ Serialize object as a JSON string, passing any json module specific arguments to the stdlib json module. """
+        if set(kwargs) - {"separators", "sort_keys", "indent"}:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj, kwargs.get("sort_keys"), bool(kwargs.get("indent"))).decode("utf-8")
+
+    def loads(self, s: str|bytes, **kwargs):
+        """ Deserialize JSON string or bytes using orjson. """
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs) -> Response:
+        """ Serialize the arguments as JSON bytes via orjson and return a Flask Response, as jsonify does. """
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype)
+
+#JSON provider used for all responses, orjson is used if installed unless set to json (set via JSON_PROVIDER environment variable)
+JSON_PROVIDER = os.environ.get("JSON_PROVIDER", "orjson").lower()
+
 #initialise Flask app
 app = Flask(__name__)
 
+#set the JSON provider used by jsonify and all pre-serialized responses
+app.json = OrjsonProvider(app) if (JSON_PROVIDER == "orjson" and orjson is not None) else StdlibJSONProvider(app)
+
 #register routes/endpoints with or without trailing slash
 app.url_map.strict_slashes = False
 
 #list of supported attributes
 all_attributes = ["name", "localOtherName", "type", "parentCode", "flag", "latLng", "history"]
 
+#list of supported output formats for the format query string parameter, the arrow and parquet formats require pyarrow to be installed, 
+# other than for the full /api/all dataset if its prebuilt files are available
+supported_formats = ["json", "csv", "geojson", "ndjson"] + (["arrow", "parquet"] if pyarrow is not None else [])
+
+#mimetype of MessagePack responses, returned instead of JSON via ?format=msgpack or the Accept header if msgpack is installed
+MSGPACK_MIMETYPE = "application/msgpack"
+if msgpack is not None:
+    supported_formats.append("msgpack")
+
+#mimetype of each binary columnar output format
+arrow_mimetypes = {"arrow": "application/vnd.apache.arrow.file", "parquet": "application/vnd.apache.parquet"}
+
+#list of supported JSON encodings for the encoding query string parameter
+supported_encodings = ["columnar"]
+
+#path to the prebuilt binary dataset snapshot, created via 'python index.py --build-snapshot' (set via ISO3166_2_SNAPSHOT environment variable)
+SNAPSHOT_PATH = os.environ.get("ISO3166_2_SNAPSHOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "iso3166-2.snapshot"))
+
+#layout version of the snapshot file, bumped whenever the keys stored in the snapshot change
+SNAPSHOT_FORMAT_VERSION = 1
+
+#directory of the per-country dataset shards and their manifest, created via 'python index.py --build-snapshot' (set via ISO3166_2_SHARDS environment variable)
+SHARD_DIR = os.environ.get("ISO3166_2_SHARDS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "shards"))
+
+#path to the per-country content hashes of each built dataset version, used by /api/sync (set via ISO3166_2_HASH_HISTORY environment variable)
+HASH_HISTORY_PATH = os.environ.get("ISO3166_2_HASH_HISTORY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "hashes.json"))
+
+#directory of the full dataset exported as Arrow IPC and Parquet files named by dataset version, created via 'python index.py --build-snapshot' (set via ISO3166_2_ARROW environment variable)
+ARROW_DIR = os.environ.get("ISO3166_2_ARROW", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "arrow"))
+
+#the full /api/all dataset is served in the arrow and parquet formats from the prebuilt files, so without pyarrow, if available
+if pyarrow is None:
+    supported_formats.extend(format_param for format_param in arrow_mimetypes 
+                             if os.path.isfile(os.path.join(ARROW_DIR, f"iso3166-2-{iso3166_2_version}.{format_param}")))
+
+#maximum number of country shards kept in memory at once (set via SHARD_CACHE_SIZE environment variable)
+SHARD_CACHE_SIZE = int(os.environ.get("SHARD_CACHE_SIZE", 32))
+
+#maximum number of parsed localOtherName attributes kept in memory for the lang query string parameter (set via LOCAL_NAME_CACHE_SIZE environment variable)
+LOCAL_NAME_CACHE_SIZE = int(os.environ.get("LOCAL_NAME_CACHE_SIZE", 1024))
+
+#maximum number of pre-encoded per-country JSON fragments, across all filter attribute sets (set via FRAGMENT_CACHE_SIZE environment variable)
+FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", 2048))
+
+#brotli quality of the pre-serialized /api/all responses, quality 11 compresses the full dataset under 15% smaller than 5 but is 
+# around 80x slower, blocking the first /api/all request of each instance for seconds (set via BROTLI_QUALITY environment variable)
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 5))
+
+#maximum total bytes of pre-serialized filtered /api/all responses kept in memory, across all filter attribute sets (set via PROJECTION_CACHE_MAX_BYTES environment variable)
+PROJECTION_CACHE_MAX_BYTES = int(os.environ.get("PROJECTION_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+#maximum total bytes of cached data endpoint responses (set via RESPONSE_CACHE_MAX_BYTES environment variable)
+RESPONSE_CACHE_MAX_BYTES = int(os.environ.get("RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+
+#length of the character n-grams in the search index, used to get the candidate subdivision names for fuzzy matching
+SEARCH_NGRAM_SIZE = 3
+
+#number of threads used to batch score search terms, -1 for all CPU cores (set via SEARCH_WORKERS environment variable)
+SEARCH_WORKERS = int(os.environ.get("SEARCH_WORKERS", 1))
+
+#minimum likeness score of searches whose candidate names are found via the BK-tree rather than the n-gram index (set via SEARCH_BKTREE_MIN_LIKENESS environment variable)
+SEARCH_BKTREE_MIN_LIKENESS = int(os.environ.get("SEARCH_BKTREE_MIN_LIKENESS", 90))
+
+#default and maximum number of results per page of /api/search, when paginated via the limit & offset query string parameters (set via SEARCH_LIMIT and SEARCH_MAX_LIMIT environment variables)
+SEARCH_LIMIT = int(os.environ.get("SEARCH_LIMIT", 10))
+SEARCH_MAX_LIMIT = int(os.environ.get("SEARCH_MAX_LIMIT", 500))
+
+#maximum number of cached search results and the seconds each is kept for (set via SEARCH_CACHE_SIZE and SEARCH_CACHE_TTL environment variables)
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 4096))
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 3600))
+
+#default and maximum number of results returned by /api/autocomplete (set via AUTOCOMPLETE_LIMIT and AUTOCOMPLETE_MAX_LIMIT environment variables)
+AUTOCOMPLETE_LIMIT = int(os.environ.get("AUTOCOMPLETE_LIMIT", 10))
+AUTOCOMPLETE_MAX_LIMIT = int(os.environ.get("AUTOCOMPLETE_MAX_LIMIT", 100))
+
+#maximum number of resolved /api/country_name input names kept in memory (set via COUNTRY_NAME_CACHE_SIZE environment variable)
+COUNTRY_NAME_CACHE_SIZE = int(os.environ.get("COUNTRY_NAME_CACHE_SIZE", 1024))
+
 #token required to call /clear-cache (set via CACHE_CLEAR_TOKEN environment variable)
 CACHE_CLEAR_TOKEN = os.environ.get("CACHE_CLEAR_TOKEN", "")
 
@@ -95,6 +271,8 @@ NAME_CONVERTED = {
     "Congo, the Democratic Republic of the", "Ivory Coast": "Côte d'Ivoire", "Cape Verde": "Cabo Verde",
     "Cocos Islands": "Cocos (Keeling) Islands", "Falkland Islands": "Falkland Islands (Malvinas)",
     "Micronesia": "Micronesia, Federated States of", "United Kingdom": "United Kingdom of Great Britain and Northern Ireland",
+    "UK": "United Kingdom of Great Britain and Northern Ireland", "Great Britain": "United Kingdom of Great Britain and Northern Ireland",
+    "Britain": "United Kingdom of Great Britain and Northern Ireland",
     "South Georgia": "South Georgia and the South Sandwich Islands", "Iran": "Iran, Islamic Republic of",
     "North Korea": "Korea, Democratic People's Republic of", "South Korea": "Korea, Republic of",
     "Laos": "Lao People's Democratic Republic", "Moldova": "Moldova, Republic of", "Saint Martin": "Saint Martin (French part)",
@@ -111,28 +289,1038 @@ NAME_CONVERTED = {
 
 @lru_cache()
 def get_subdivision_instance():
-    """ Cache function for initialization of Subdivisions instance. """
+    """ Cache function for initialization of Subdivisions instance, only built on demand for search and subdivision codes. """
     return Subdivisions()
 
+@lru_cache()
+def get_snapshot() -> dict|None:
+    """ 
+    Cache function for the prebuilt binary dataset snapshot, loaded in a single read. None is 
+    returned if the snapshot doesn't exist or was built for a different version of iso3166-2, 
+    in which case the data is loaded via the Subdivisions class instead. 
+    """
+    try:
+        with open(SNAPSHOT_PATH, 'rb') as snapshot_file:
+            snapshot = pickle.loads(snapshot_file.read()) # nosec B301 - snapshot is a trusted build artifact
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return None
+
+    #ignore stale snapshots built from a different dataset version or snapshot layout
+    if not isinstance(snapshot, dict) or snapshot.get("formatVersion") != SNAPSHOT_FORMAT_VERSION or \
+        snapshot.get("version") != iso3166_2_version:
+        return None
+
+    return snapshot
+
+@lru_cache()
+def get_shard_manifest() -> dict|None:
+    """ 
+    Cache function for the manifest of the per-country dataset shards, listing each country's 
+    subdivision codes. None is returned if the manifest doesn't exist or was built for a 
+    different version of iso3166-2, in which case no shards are used. 
+    """
+    try:
+        with open(os.path.join(SHARD_DIR, "manifest.json"), encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+
+    #ignore stale manifests built from a different dataset version or snapshot layout
+    if not isinstance(manifest, dict) or manifest.get("formatVersion") != SNAPSHOT_FORMAT_VERSION or \
+        manifest.get("version") != iso3166_2_version:
+        return None
+
+    return manifest
+
+@lru_cache(maxsize=SHARD_CACHE_SIZE)
+def get_country_shard(alpha2: str) -> dict:
+    """ Cache function for a country's subdivision data loaded from its shard, bounded to the most recently used countries. """
+    with open(os.path.join(SHARD_DIR, f"{alpha2}.snapshot"), 'rb') as shard_file:
+        return pickle.loads(shard_file.read()) # nosec B301 - shards are trusted build artifacts
+
 @lru_cache()
 def get_all_subdivisions():
-    """ Cache function for all data variable of Subdivisions instance. """
+    """ Cache function for all subdivision data, from the snapshot or shards if available else the Subdivisions instance. """
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot["all"]
+    manifest = get_shard_manifest()
+    if manifest is not None:
+        return {country: get_country_shard.__wrapped__(country) for country in manifest["countries"]}
     return get_subdivision_instance().all
 
+@lru_cache()
+def get_all_response_cache() -> dict:
+    """
+    Cache function for the pre-serialized /api/all response with no query string parameters, 
+    serialized once per dataset version. The JSON bytes are stored alongside their gzip and 
+    brotli (if installed) compressed variants and a content-hash ETag.
+    """
+    return build_response_cache(dumps_json(get_all_subdivisions()))
+
+def build_response_cache(body: bytes) -> dict:
+    """ Return the pre-serialized JSON bytes with their gzip and brotli (if installed) compressed variants and content-hash ETag. """
+    return {
+        "identity": body,
+        "gzip": gzip.compress(body, compresslevel=9, mtime=0),
+        "br": brotli.compress(body, quality=BROTLI_QUALITY) if brotli is not None else None,
+        "etag": hashlib.sha256(body).hexdigest()[:32]
+    }
+
+class ByteSizeLRUCache:
+    """ 
+    Least recently used cache of byte-sized values, evicting the least recently used entries 
+    once the total size of the cached values exceeds max_bytes. Values larger than max_bytes 
+    are not cached. Hits and misses are counted for monitoring. Access is guarded by a lock as 
+    requests can be served from multiple threads. 
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """ Return the cached value of the key, marking it as most recently used, else None. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value, size: int) -> None:
+        """ Cache the value of the key with its size in bytes, evicting entries as required. """
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self.current_bytes -= self._entries.popitem(last=False)[1][1]
+
+    def clear(self) -> None:
+        """ Remove all cached entries and reset the hit and miss counters. """
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class TTLLRUCache:
+    """ 
+    Least recently used cache of up to max_size entries, each expiring ttl seconds after being 
+    set. Any value other than None can be cached, including empty results. Hits and misses are 
+    counted for monitoring. Access is guarded by a lock as requests can be served from multiple 
+    threads. 
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """ Return the cached value of the key, marking it as most recently used, else None if not cached or expired. """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                if entry is not None:
+                    self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value) -> None:
+        """ Cache the value of the key, evicting the least recently used entries as required. """
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """ Remove all cached entries and reset the hit and miss counters. """
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+#cache of pre-serialized filtered /api/all responses, keyed by the parsed tuple of filter attributes
+projection_response_cache = ByteSizeLRUCache(PROJECTION_CACHE_MAX_BYTES)
+
+def get_projection_response_cache(attributes: tuple[str]) -> dict:
+    """
+    Return the pre-serialized and precompressed /api/all response filtered to the parsed tuple of 
+    attributes from parse_filter_attributes, building it once per attribute set. The responses 
+    are evicted under the PROJECTION_CACHE_MAX_BYTES memory cap.
+    """
+    cache = projection_response_cache.get(attributes)
+    if cache is None:
+        cache = build_response_cache(b"{" + b",".join(iter_country_json(get_country_codes(), attributes)) + b"}\n")
+        projection_response_cache.set(attributes, cache, sum(len(cache[encoding] or b"") for encoding in ("identity", "gzip", "br")))
+    return cache
+
+@lru_cache(maxsize=2)
+def get_arrow_file(format_param: str) -> bytes:
+    """ 
+    Cache function for the full dataset exported as an Apache Arrow IPC or Parquet file, read 
+    from the file prebuilt for the dataset version and served as is for each /api/all request, 
+    so pyarrow isn't required. The file is built from the dataset if it isn't available. 
+    """
+    try:
+        with open(os.path.join(ARROW_DIR, f"iso3166-2-{iso3166_2_version}.{format_param}"), 'rb') as arrow_file:
+            return arrow_file.read()
+    except OSError:
+        return serialize_arrow_table(build_arrow_table(get_all_subdivisions()), format_param)
+
+@lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def get_country_projection(alpha2: str, attributes: tuple[str]|None=None) -> dict:
+    """ 
+    Cache function for a country's subdivision data projected to the parsed tuple of attributes 
+    from parse_filter_attributes. The returned object is shared between requests so mustn't be 
+    modified. 
+    """
+    country_data = get_country_data(alpha2)
+    if attributes is None:
+        return country_data
+    return filter_dict(country_data, set(attributes))
+
+@lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def get_country_fragment(alpha2: str, attributes: tuple[str]|None=None) -> bytes:
+    """ 
+    Cache function for a country's subdivision data pre-encoded as JSON bytes, optionally 
+    filtered to the parsed tuple of attributes from parse_filter_attributes. 
+    """
+    return app.json.dumps_bytes(get_country_projection(alpha2, attributes))
+
+@lru_cache(maxsize=LOCAL_NAME_CACHE_SIZE)
+def get_local_names(local_other_name: str) -> dict:
+    """ 
+    Cache function for a localOtherName attribute parsed into its names per language, in the form 
+    {lang: names}, so repeated filtering by the lang query string parameter is a lookup rather than 
+    a regex scan. Attributes are parsed on demand, so only the requested countries are loaded. 
+    """
+    return parse_local_other_name(local_other_name)
+
+@lru_cache()
+def get_language_index() -> dict:
+    """ 
+    Cache function for the inverted index of each ISO 639 language code in the localOtherName 
+    attribute to the subdivisions with a name in that language, in the form 
+    {lang: {country_code: [subdiv_codes]}}. 
+    """
+    language_index = {}
+    for country_code in get_country_codes():
+        for subdiv_code, subdiv_data in get_country_data(country_code).items():
+            if subdiv_data.get('localOtherName'):
+                for lang in parse_local_other_name(subdiv_data['localOtherName']):
+                    language_index.setdefault(lang, {}).setdefault(country_code, []).append(subdiv_code)
+    return dict(sorted(language_index.items()))
+
+@lru_cache()
+def get_subdivision_index() -> dict:
+    """ 
+    Cache function for the flat index of all (country_code, subdiv_code) pairs in dataset order, 
+    alongside the offset of each country's first subdivision in the index, used for cursor 
+    pagination of /api/all at the subdivision level. The subdivision codes are read from the 
+    shard manifest, if available, so the whole dataset isn't loaded. 
+    """
+    manifest = get_shard_manifest()
+    country_subdivisions = manifest["countries"] if manifest is not None else get_all_subdivisions()
+    entries, country_offsets = [], []
+    for country_code in get_country_codes():
+        country_offsets.append(len(entries))
+        entries.extend((country_code, subdiv_code) for subdiv_code in country_subdivisions[country_code])
+    country_offsets.append(len(entries))
+    return {"entries": entries, "countryOffsets": country_offsets}
+
+@lru_cache(maxsize=FRAGMENT_CACHE_SIZE)
+def get_country_msgpack(alpha2: str, attributes: tuple[str]|None=None) -> bytes:
+    """ 
+    Cache function for a country's subdivision data pre-encoded as MessagePack bytes, optionally 
+    filtered to the parsed tuple of attributes from parse_filter_attributes. 
+    """
+    return dumps_msgpack(get_country_projection(alpha2, attributes))
+
+@lru_cache()
+def get_search_index() -> dict:
+    """ 
+    Cache function for the index of normalized subdivision names and local/other names searched 
+    by /api/search, built in the same order as Subdivisions.search. Alongside the (normalized_name, 
+    alpha2, code) entries it stores the names that contain a comma, an inverted index of each 
+    character n-gram to the entries containing it and their number of occurrences, the entries 
+    of each name length and the entries of each exact normalized name. 
+    """
+    entries, comma_names = [], set()
+    for alpha2, subdivisions in get_all_subdivisions().items():
+        for code, subdiv_data in subdivisions.items():
+            for attr in ("name", "localOtherName"):
+                val = subdiv_data.get(attr)
+                if val:
+                    normalized = unquote_plus(val).lower()
+                    entries.append((normalized.replace(" ", ""), alpha2, code))
+                    if ("," in val):
+                        comma_names.add(normalized)
+
+    ngrams, lengths, exact = {}, {}, {}
+    for entry_id, (name, _, _) in enumerate(entries):
+        exact.setdefault(name, []).append(entry_id)
+        for ngram, count in Counter(name[i:i + SEARCH_NGRAM_SIZE] for i in range(len(name) - SEARCH_NGRAM_SIZE + 1)).items():
+            ngrams.setdefault(ngram, []).append((entry_id, count))
+        lengths.setdefault(len(name), []).append(entry_id)
+
+    return {"entries": entries, "commaNames": comma_names, "ngrams": ngrams, "lengths": lengths, "exact": exact}
+
+def normalize_autocomplete_name(name: str) -> str:
+    """ Normalize a subdivision name or autocomplete prefix, transliterated to ASCII, casefolded and with punctuation as single spaces. """
+    return " ".join(re.sub(r"[\W_]+", " ", unidecode(name).casefold()).split())
+
+@lru_cache()
+def get_autocomplete_index() -> dict:
+    """ 
+    Cache function for the sorted prefix index of /api/autocomplete, in the form 
+    {country_code: (keys, entries)}, with the index of every country under the empty 
+    country code. Each subdivision name and individual local/other name is normalized into 
+    the sorted keys, with the (country_code, subdiv_code, name, matched_name) entry at the 
+    same position, so the names starting with a prefix are a contiguous range found via bisect. 
+    """
+    rows = []
+    for alpha2, subdivisions in get_all_subdivisions().items():
+        for code, subdiv_data in subdivisions.items():
+            name = subdiv_data.get("name") or ""
+            names = [name]
+            #split the local/other names, keeping quoted names with commas whole, and remove their language tags
+            for local_name in re.findall(r"'[^']*'|[^,]+", subdiv_data.get("localOtherName") or ""):
+                local_name = re.sub(r"\s*\([^()]*\)$", "", local_name.strip().strip("'")).strip()
+                if local_name and local_name not in names:
+                    names.append(local_name)
+            for matched_name in names:
+                key = normalize_autocomplete_name(matched_name)
+                if key:
+                    rows.append((key, alpha2, code, name, matched_name))
+    rows.sort()
+
+    autocomplete_index = {"": ([], [])}
+    for row in rows:
+        for alpha2 in ("", row[1]):
+            keys, entries = autocomplete_index.setdefault(alpha2, ([], []))
+            keys.append(row[0])
+            entries.append(row[1:])
+    return autocomplete_index
+
+def autocomplete_subdivisions(prefix: str, alpha2_codes: list[str]|None=None, limit: int=AUTOCOMPLETE_LIMIT) -> list[dict]:
+    """
+    Return the subdivisions with a name or local/other name starting with the prefix, ignoring 
+    case and accents, in alphabetical order of their matched name. Each subdivision is only 
+    returned once, for its first matching name.
+
+    Parameters
+    ==========
+    :prefix: str
+        start of the sought subdivision name.
+    :alpha2_codes: list (default=None)
+        alpha-2 codes of the countries to search, else all countries.
+    :limit: int (default=AUTOCOMPLETE_LIMIT)
+        maximum number of subdivisions returned.
+
+    Returns
+    =======
+    :results: list
+        subdivision codes, names and matched names of the top subdivisions.
+    """
+    prefix = normalize_autocomplete_name(prefix)
+    autocomplete_index = get_autocomplete_index()
+
+    def iter_matches(alpha2: str):
+        keys, entries = autocomplete_index.get(alpha2, ([], []))
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            yield keys[position], entries[position]
+            position += 1
+
+    #merge the sorted matches of each country
+    matches = heapq.merge(*(iter_matches(alpha2) for alpha2 in alpha2_codes)) if alpha2_codes else iter_matches("")
+    results, seen = [], set()
+    for _, (alpha2, code, name, matched_name) in matches:
+        if len(results) >= limit:
+            break
+        if code in seen:
+            continue
+        seen.add(code)
+        results.append({"countryCode": alpha2, "subdivisionCode": code, "name": name, "matchedName": matched_name})
+    return results
+
+def normalize_country_name(name: str) -> str:
+    """ Normalize a country name or code the same way thefuzz processes names, transliterated to ASCII and with single spaces. """
+    return " ".join(fuzz_utils.full_process(unidecode(name)).split())
+
+@lru_cache()
+def get_country_name_index() -> dict:
+    """ 
+    Cache function for the resolver index of /api/country_name. Maps the normalized ISO 3166-1 
+    name, NAME_CONVERTED aliases, common name, official name and alpha-2, alpha-3 and numeric 
+    codes of each country to its alpha-2 code, in that order of precedence. Alongside it stores 
+    the list of country names fuzzy matched for inputs not in the index and the alpha-2 code of 
+    each of those names. 
+    """
+    country_names = {country.name.strip(' '): country.alpha_2 for country in countries}
+    names = {}
+    for name, alpha2 in country_names.items():
+        names.setdefault(normalize_country_name(name), alpha2)
+    for alias, name in NAME_CONVERTED.items():
+        alpha2 = names.get(normalize_country_name(name)) or resolve_fuzzy_country_name(name, list(country_names), country_names)
+        if alpha2:
+            names.setdefault(normalize_country_name(alias), alpha2)
+    for attr in ("common_name", "official_name", "alpha_2", "alpha_3", "numeric"):
+        for country in countries:
+            if getattr(country, attr, None):
+                names.setdefault(normalize_country_name(getattr(country, attr)), country.alpha_2)
+    names.pop("", None)
+
+    return {"names": names, "candidates": list(country_names), "candidateCodes": country_names}
+
+def resolve_fuzzy_country_name(name: str, candidates: list[str], candidate_codes: dict) -> str|None:
+    """ Return the alpha-2 code of the closest candidate country name to the input name via thefuzz, if its likeness is 90 or more, else None. """
+    best_match = process.extract(name.upper(), candidates)[0]
+    return candidate_codes[best_match[0]] if best_match[1] >= 90 else None
+
+@lru_cache(maxsize=COUNTRY_NAME_CACHE_SIZE)
+def resolve_country_name(name: str) -> str|None:
+    """
+    Resolve a country name, alias or ISO 3166-1 code into its alpha-2 code. Names in the 
+    resolver index are a dictionary lookup, otherwise the closest ISO 3166-1 country name with 
+    a likeness of 90 or more is used. Inputs of 3 characters or fewer that aren't in the index 
+    aren't fuzzy matched, as they're codes rather than names and would otherwise resolve to the 
+    country with the most similar code, e.g. UK to UA. Resolved names are memoized in a bounded 
+    LRU cache.
+
+    Parameters
+    ==========
+    :name: str
+        country name, alias or ISO 3166-1 alpha-2, alpha-3 or numeric code.
+
+    Returns
+    =======
+    :alpha2: str/None
+        alpha-2 code of the country, or None if no country matches the name.
+    """
+    country_name_index = get_country_name_index()
+    normalized_name = normalize_country_name(name)
+    alpha2 = country_name_index["names"].get(normalized_name)
+    if alpha2 is None and len(normalized_name) > 3:
+        alpha2 = resolve_fuzzy_country_name(name, country_name_index["candidates"], country_name_index["candidateCodes"])
+    return alpha2
+
+@lru_cache()
+def get_search_bktree() -> dict:
+    """ 
+    Cache function for the BK-tree of the unique normalized names in the search index, using the 
+    Indel (insertion/deletion) distance the fuzzy ratio is based on. Node 0 is the root, each 
+    node storing its name and an object of distance to the child node at that distance from it. 
+    """
+    names, children = [], []
+    for name in get_search_index()["exact"]:
+        names.append(name)
+        children.append({})
+        if len(names) == 1:
+            continue
+        node = 0
+        while True:
+            distance = Indel.distance(name, names[node])
+            if distance not in children[node]:
+                children[node][distance] = len(names) - 1
+                break
+            node = children[node][distance]
+    return {"names": names, "children": children}
+
+def get_bktree_candidates(term: str, likeness_score: int) -> list[int]:
+    """
+    Return the ids of the search index entries whose fuzzy ratio to the search term can reach 
+    the likeness score via the BK-tree of the names. The ratio is 100 * (1 - d / (len1 + len2)) 
+    for the Indel distance d, so the longest name that can reach the score gives the maximum 
+    distance searched. By the triangle inequality, only the children of a node within that 
+    distance of the term's distance to it can match, pruning every other subtree, so the 
+    names visited grow with the number of near matches rather than the number of names.
+
+    Parameters
+    ==========
+    :term: str
+        normalized search term.
+    :likeness_score: int
+        minimum rounded fuzzy ratio of matching entries.
+
+    Returns
+    =======
+    :candidates: list
+        ids of the candidate entries in the search index.
+    """
+    bktree = get_search_bktree()
+    names, children = bktree["names"], bktree["children"]
+    if not names:
+        return []
+
+    #ratios are rounded, so the lowest unrounded ratio that can reach the likeness score is half a point below it
+    min_ratio = max(likeness_score - 0.5, 1e-9)
+    max_length = len(term) * (200 - min_ratio) / min_ratio
+    max_distance = int((1 - min_ratio / 100) * (len(term) + max_length) + 1e-9)
+
+    exact = get_search_index()["exact"]
+    candidates, stack = [], [0]
+    while stack:
+        node = stack.pop()
+        distance = Indel.distance(term, names[node])
+        if distance <= max_distance:
+            candidates.extend(exact[names[node]])
+        for child_distance, child in children[node].items():
+            if distance - max_distance <= child_distance <= distance + max_distance:
+                stack.append(child)
+    return sorted(candidates)
+
+def get_search_candidates(term: str, likeness_score: int) -> list[int]:
+    """
+    Return the ids of the search index entries whose fuzzy ratio to the search term can reach 
+    the likeness score, in index order, so only these need scoring. The ratio is 2 * LCS / (len1 + len2), 
+    so each entry length gives a minimum LCS, and with it a minimum number of n-grams shared with 
+    the term: each deleted character removes at most n of a string's n-grams and each inserted 
+    character at most n - 1. Entries of a length that can't reach the score are skipped, others 
+    need the minimum number of shared n-grams, counted via the inverted index. No entry that can 
+    match is ever excluded. Likeness scores of SEARCH_BKTREE_MIN_LIKENESS or more use the BK-tree 
+    of the names instead.
+
+    Parameters
+    ==========
+    :term: str
+        normalized search term.
+    :likeness_score: int
+        minimum rounded fuzzy ratio of matching entries.
+
+    Returns
+    =======
+    :candidates: list
+        ids of the candidate entries in the search index.
+    """
+    #high likeness scores allow so few edits that the BK-tree prunes more names than the n-gram counts
+    if (likeness_score >= SEARCH_BKTREE_MIN_LIKENESS):
+        return get_bktree_candidates(term, likeness_score)
+
+    search_index = get_search_index()
+    n = SEARCH_NGRAM_SIZE
+    term_length = len(term)
+
+    #count the occurrences of the term's n-grams shared with each entry
+    shared = {}
+    for ngram, count in Counter(term[i:i + n] for i in range(term_length - n + 1)).items():
+        for entry_id, entry_count in search_index["ngrams"].get(ngram, ()):
+            shared[entry_id] = shared.get(entry_id, 0) + min(count, entry_count)
+
+    #ratios are rounded, so the lowest unrounded ratio that can reach the likeness score is half a point below it
+    min_ratio = likeness_score - 0.5
+    candidates = []
+    for length, entry_ids in search_index["lengths"].items():
+        total_length = term_length + length
+        if (total_length == 0) or (200 * min(term_length, length) / total_length < min_ratio):
+            continue
+        min_lcs = max(0, ceil(min_ratio * total_length / 200 - 1e-9))
+        min_shared = max((term_length - n + 1) - n * (term_length - min_lcs) - (n - 1) * (length - min_lcs),
+                         (length - n + 1) - n * (length - min_lcs) - (n - 1) * (term_length - min_lcs))
+        if (min_shared <= 0):
+            candidates.extend(entry_ids)
+        else:
+            candidates.extend(entry_id for entry_id in entry_ids if shared.get(entry_id, 0) >= min_shared)
+    return sorted(candidates)
+
+def score_search_terms(terms: list[str], likeness_score: int) -> dict[str, list[int]]:
+    """
+    Score the normalized search terms against their candidate names from the search index, 
+    returning the ids of the entries meeting the likeness score for each term, in index order. 
+    All terms are scored against the union of their candidates in one vectorized rapidfuzz cdist 
+    call, across SEARCH_WORKERS threads. numpy is a requirement, but if it can't be imported each 
+    term is scored individually as a fallback. Scores are the same as thefuzz's fuzz.ratio, the unrounded ratios computed in 
+    double precision and rounded the same way.
+
+    Parameters
+    ==========
+    :terms: list
+        normalized search terms.
+    :likeness_score: int
+        minimum rounded fuzzy ratio of matching entries.
+
+    Returns
+    =======
+    :term_matches: dict
+        object of each search term to the ids of its matching search index entries.
+    """
+    entries = get_search_index()["entries"]
+    terms = list(dict.fromkeys(terms))
+    candidates = {term: get_search_candidates(term, likeness_score) for term in terms}
+
+    if numpy is None or not terms:
+        return {term: [entry_id for entry_id in candidates[term] if fuzz.ratio(term, entries[entry_id][0]) >= likeness_score] for term in terms}
+
+    #any entry meeting the likeness score is in the term's candidates, so the whole row of the union can be used
+    union = sorted(set().union(*candidates.values()))
+    scores = rapidfuzz_process.cdist(terms, [entries[entry_id][0] for entry_id in union], scorer=rapidfuzz_fuzz.ratio, 
+                                     dtype=numpy.float64, workers=SEARCH_WORKERS)
+    term_matches = {}
+    for term, row in zip(terms, scores):
+        term_matches[term] = [union[position] for position in numpy.flatnonzero(row >= likeness_score - 0.5) 
+                              if int(round(float(row[position]))) >= likeness_score]
+    return term_matches
+
+def get_search_scores(terms: list[str], likeness_score: int) -> dict:
+    """
+    Score the normalized search terms against the subdivision names and local/other names, 
+    returning the best match score of each matching subdivision code in the order they were 
+    found, as {subdiv_code: (match_score, country_code)}.
+
+    Parameters
+    ==========
+    :terms: list
+        normalized search terms, lowercase without spaces.
+    :likeness_score: int
+        likeness score between 0 and 100 that the subdivision names have to meet. If 100 and 
+        no exact match is found for a term then the likeness score is reduced to 85.
+
+    Returns
+    =======
+    :scores: dict
+        match score and country code of each matching subdivision code.
+    """
+    search_index = get_search_index()
+    entries = search_index["entries"]
+
+    #names identical to the term are the only ones that can score 100 for terms under 100 characters, as d 
+    # insertions/deletions need a combined length of 200 * d and length difference of at most d to round up to 
+    # 100, so exact matches are looked up directly, with the remaining terms scored against their candidate names
+    # in one batch, falling back to a likeness of 85 for terms with no match
+    term_matches = {}
+    if likeness_score == 100:
+        term_matches = {term: search_index["exact"][term] for term in terms if len(term) < 100 and term in search_index["exact"]}
+    term_matches.update(score_search_terms([term for term in terms if term not in term_matches], likeness_score))
+    if likeness_score == 100:
+        term_matches.update(score_search_terms([term for term in terms if not term_matches[term]], 85))
+
+    #best score of each matching subdivision, in the order they were found
+    scores = {}
+    for term in terms:
+        for entry_id in term_matches[term]:
+            norm_name, alpha2, code = entries[entry_id]
+            score = Subdivisions._score_relevance(term, norm_name)
+            if code not in scores or score > scores[code][0]:
+                scores[code] = (score, alpha2)
+    return scores
+
+#cache of search match scores, including searches with no results, keyed by the normalized search terms and likeness score
+search_cache = TTLLRUCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+
+def search_subdivisions(input_search_term: str, likeness_score: int=100, exclude_match_score: bool=True, 
+                        limit: int|None=None, offset: int=0) -> dict|list:
+    """
+    Search for subdivisions by their name and local/other names, returning the same output as 
+    Subdivisions.search with local_other_name_search=True. Rather than scoring every name in the 
+    dataset, each search term is only scored against the candidate names from the n-gram search 
+    index that can meet the likeness score. Terms exactly matching a name with the default 
+    likeness of 100 skip fuzzy scoring altogether. The match scores are cached in the search 
+    cache by the normalized terms and likeness score, including searches with no results, so 
+    repeated searches and each page of a search aren't rescored. If a limit is set, only the page 
+    of the best matches from offset is selected, via a bounded heap rather than sorting every match, 
+    and only their subdivision objects are built.
+
+    Parameters
+    ==========
+    :input_search_term: str
+        one or more comma separated subdivision names to search for.
+    :likeness_score: int (default=100)
+        likeness score between 0 and 100 that the subdivision names have to meet. If 100 and 
+        no exact match is found for a term then the likeness score is reduced to 85.
+    :exclude_match_score: bool (default=True)
+        exclude the % match score from the output, returning the nested {country_code: {subdiv_code: data}} 
+        object, else a list of the subdivision objects sorted by match score.
+    :limit: int (default=None)
+        maximum number of subdivisions returned, ranked by match score then the order they were 
+        found in, else all matching subdivisions are returned.
+    :offset: int (default=0)
+        number of the ranked subdivisions skipped before the page, if limit is set.
+
+    Returns
+    =======
+    :search_results: dict/list
+        subdivision objects matching the search terms. If limit is set then the page of subdivision 
+        objects is returned in a {"data", "limit", "offset", "totalMatches"} envelope.
+    """
+    search_index = get_search_index()
+    all_subdivisions = get_all_subdivisions()
+
+    #normalize input, splitting it into terms while keeping any subdivision names that contain commas whole
+    input_normalized = unquote_plus(input_search_term).lower()
+    terms = []
+    for full_name in search_index["commaNames"]:
+        if full_name in input_normalized:
+            terms.append(full_name.replace(" ", ""))
+            input_normalized = input_normalized.replace(full_name, "")
+    terms.extend(t.strip().replace(" ", "") for t in input_normalized.split(",") if t.strip())
+
+    #repeated terms can't change the results, local/other names are always searched
+    terms = list(dict.fromkeys(terms))
+    cache_key = (tuple(terms), likeness_score, True)
+    scores = search_cache.get(cache_key)
+    if scores is None:
+        scores = get_search_scores(terms, likeness_score)
+        search_cache.set(cache_key, scores)
+
+    #select the page of the best matches via a bounded heap, returning an empty page without ranking 
+    # any matches if the offset is past the last match
+    codes = list(scores)
+    if limit is not None:
+        if offset >= len(codes):
+            codes = []
+        else:
+            ranked = heapq.nsmallest(offset + limit, range(len(codes)), key=lambda position: (-scores[codes[position]][0], position))
+            codes = [codes[position] for position in ranked[offset:]]
+
+    found = {}
+    for code in codes:
+        score, alpha2 = scores[code]
+        found[code] = {
+            **all_subdivisions[alpha2][code],
+            "code": code,
+            "matchScore": score,
+            "countryCode": alpha2,
+            "subdivisionCode": code
+        }
+
+    #group the results by country code, without the match score
+    if exclude_match_score:
+        grouped = {}
+        for code, data in found.items():
+            data.pop("matchScore", None)
+            country_code = data.pop("countryCode", "")
+            sub_code = data.pop("subdivisionCode", code)
+            grouped.setdefault(country_code, {})[sub_code] = data
+        search_results = dict(sorted(grouped.items()))
+    else:
+        #reorder attributes to include the match score, sorted by match score descending
+        search_results = []
+        for code, data in found.items():
+            search_results.append({
+                "countryCode": data.pop("countryCode", ""),
+                "subdivisionCode": data.pop("subdivisionCode", code),
+                **data,
+                "matchScore": data.pop("matchScore", 0)
+            })
+        search_results.sort(key=lambda x: x.get("matchScore", 0), reverse=True)
+
+    #wrap the page of results with the total number of matches, if applicable
+    if limit is not None:
+        search_results = {"data": search_results, "limit": limit, "offset": offset, "totalMatches": len(scores)}
+    return search_results
+
+def get_country_data(alpha2: str) -> dict:
+    """ 
+    Return the subdivision data for a single alpha-2 country code. If all the data hasn't already 
+    been loaded then only the country's shard is loaded, if available. Raises KeyError if the 
+    country isn't in the dataset. 
+    """
+    manifest = get_shard_manifest()
+    if manifest is not None and not get_all_subdivisions.cache_info().currsize:
+        if alpha2 not in manifest["countries"]:
+            raise KeyError(alpha2)
+        return get_country_shard(alpha2)
+    return get_all_subdivisions()[alpha2]
+
+def get_country_codes() -> list[str]:
+    """ Return the alpha-2 codes of all countries in the dataset, in dataset order. """
+    manifest = get_shard_manifest()
+    if manifest is not None:
+        return list(manifest["countries"])
+    return list(get_all_subdivisions())
+
 @lru_cache()
 def get_alpha2_codes() -> set[str]:
     """ Cache function for list of valid ISO 3166-1 alpha-2 country codes. """
+    manifest = get_shard_manifest()
+    if manifest is not None:
+        return set(manifest["alpha2Codes"])
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot["alpha2Codes"]
     return {c.alpha_2 for c in countries if hasattr(c, "alpha_2")}
 
 @lru_cache()
 def get_all_subdivision_codes() -> set[str]:
     """ Cache function for a flat set of all subdivision codes across every country. """
+    manifest = get_shard_manifest()
+    if manifest is not None:
+        return {code for country in manifest["countries"] for code in manifest["countries"][country]}
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot["subdivisionCodes"]
     codes = set()
     all_subs = get_all_subdivisions()
     for country in all_subs:
         codes.update(all_subs[country].keys())
     return codes
 
+def hash_country_data(country_data: dict) -> str:
+    """ Return the content hash of a country's subdivision data, independent of the JSON provider in use. """
+    return hashlib.sha256(json.dumps(country_data, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()[:32]
+
+@lru_cache()
+def get_country_hashes() -> dict[str, str]:
+    """ Cache function for the content hash of each country's subdivision data, from the shard manifest if available. """
+    manifest = get_shard_manifest()
+    if manifest is not None:
+        return manifest["hashes"]
+    all_subs = get_all_subdivisions()
+    return {country: hash_country_data(all_subs[country]) for country in all_subs}
+
+@lru_cache()
+def get_country_hash(alpha2: str) -> str:
+    """ 
+    Cache function for the content hash of a single country's subdivision data, from the shard 
+    manifest if available, else hashing only that country's data. Raises KeyError if the country 
+    isn't in the dataset. 
+    """
+    manifest = get_shard_manifest()
+    if manifest is not None:
+        return manifest["hashes"][alpha2]
+    return hash_country_data(get_country_data(alpha2))
+
+@lru_cache()
+def get_dataset_hash() -> str:
+    """ Cache function for the content hash of the whole dataset, combining the per-country hashes. """
+    country_hashes = get_country_hashes()
+    return hashlib.sha256("".join(f"{country}:{country_hashes[country]};" for country in sorted(country_hashes)).encode("utf-8")).hexdigest()[:32]
+
+@lru_cache()
+def get_hash_history() -> dict:
+    """ 
+    Cache function for the hash history written at build time, an object of each previously 
+    built dataset version to its per-country content hashes, loaded once. An empty object is 
+    returned if the hash history doesn't exist. 
+    """
+    try:
+        with open(HASH_HISTORY_PATH, encoding="utf-8") as hashes_file:
+            hash_history = json.load(hashes_file)
+    except (OSError, ValueError):
+        return {}
+    return hash_history if isinstance(hash_history, dict) else {}
+
+def get_version_hashes(version: str) -> dict[str, str]|None:
+    """ 
+    Return the per-country content hashes of a dataset version from the hash history. The current 
+    version's hashes are always available. Returns None if no hashes are stored for the version. 
+    """
+    if version == iso3166_2_version:
+        return get_country_hashes()
+    return get_hash_history().get(version)
+
+def build_hash_history(hash_history_path: str=HASH_HISTORY_PATH) -> str:
+    """
+    Build step that adds the per-country content hashes of the installed iso3166-2 dataset 
+    version to the hash history, so /api/sync can return the changes since any previously 
+    built version. Existing versions in the history are kept.
+
+    Parameters
+    ==========
+    :hash_history_path: str (default=HASH_HISTORY_PATH)
+        filepath of the hash history.
+
+    Returns
+    =======
+    :hash_history_path: str
+        filepath of the exported hash history.
+    """
+    all_subs = Subdivisions().all
+    try:
+        with open(hash_history_path, encoding="utf-8") as hashes_file:
+            hash_history = json.load(hashes_file)
+    except (OSError, ValueError):
+        hash_history = {}
+
+    hash_history[iso3166_2_version] = {country: hash_country_data(all_subs[country]) for country in all_subs}
+    os.makedirs(os.path.dirname(os.path.abspath(hash_history_path)), exist_ok=True)
+    with open(hash_history_path, 'w', encoding="utf-8") as hashes_file:
+        json.dump(hash_history, hashes_file, indent=1, sort_keys=True)
+    return hash_history_path
+
+def build_snapshot(snapshot_path: str=SNAPSHOT_PATH) -> str:
+    """
+    Build step that writes the complete ISO 3166-2 dataset, the flat set of all subdivision codes 
+    and the set of alpha-2 codes into one versioned binary snapshot, which is then loaded on 
+    cold start instead of constructing the Subdivisions class. The snapshot is tied to the 
+    installed version of iso3166-2 so must be rebuilt whenever the package is upgraded.
+
+    Parameters
+    ==========
+    :snapshot_path: str (default=SNAPSHOT_PATH)
+        filepath to export the snapshot to.
+
+    Returns
+    =======
+    :snapshot_path: str
+        filepath of the exported snapshot.
+    """
+    all_subs = Subdivisions().all
+    subdivision_codes = set()
+    for country in all_subs:
+        subdivision_codes.update(all_subs[country].keys())
+
+    snapshot = {
+        "formatVersion": SNAPSHOT_FORMAT_VERSION,
+        "version": iso3166_2_version,
+        "all": all_subs,
+        "subdivisionCodes": subdivision_codes,
+        "alpha2Codes": {c.alpha_2 for c in countries if hasattr(c, "alpha_2")}
+    }
+
+    #create output folder if applicable, export snapshot using the highest available pickle protocol
+    os.makedirs(os.path.dirname(os.path.abspath(snapshot_path)), exist_ok=True)
+    with open(snapshot_path, 'wb') as snapshot_file:
+        pickle.dump(snapshot, snapshot_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    return snapshot_path
+
+def build_arrow_files(arrow_dir: str=ARROW_DIR) -> str:
+    """
+    Build step that exports the full ISO 3166-2 dataset as an Apache Arrow IPC file and a Parquet 
+    file, named by the installed version of iso3166-2, which /api/all then serves as is without 
+    needing pyarrow. The files of any other dataset versions are removed. Requires pyarrow.
+
+    Parameters
+    ==========
+    :arrow_dir: str (default=ARROW_DIR)
+        directory to export the Arrow and Parquet files to.
+
+    Returns
+    =======
+    :arrow_dir: str
+        directory of the exported files.
+    """
+    table = build_arrow_table(Subdivisions().all)
+    os.makedirs(arrow_dir, exist_ok=True)
+    for filename in os.listdir(arrow_dir):
+        if filename.startswith("iso3166-2-") and not filename.startswith(f"iso3166-2-{iso3166_2_version}."):
+            os.remove(os.path.join(arrow_dir, filename))
+    for format_param in arrow_mimetypes:
+        with open(os.path.join(arrow_dir, f"iso3166-2-{iso3166_2_version}.{format_param}"), 'wb') as arrow_file:
+            arrow_file.write(serialize_arrow_table(table, format_param))
+    return arrow_dir
+
+def build_shards(shard_dir: str=SHARD_DIR) -> str:
+    """
+    Build step that writes each country's ISO 3166-2 subdivision data into its own binary shard, 
+    named by its alpha-2 code, alongside a small JSON manifest of each country's subdivision codes
+    and content hash. 
+    Shards are loaded lazily per country so single country requests don't need the full dataset 
+    in memory. The shards are tied to the installed version of iso3166-2.
+
+    Parameters
+    ==========
+    :shard_dir: str (default=SHARD_DIR)
+        directory to export the shards and manifest to.
+
+    Returns
+    =======
+    :shard_dir: str
+        directory of the exported shards.
+    """
+    all_subs = Subdivisions().all
+    os.makedirs(shard_dir, exist_ok=True)
+
+    #export each country's data to its own shard
+    for country in all_subs:
+        with open(os.path.join(shard_dir, f"{country}.snapshot"), 'wb') as shard_file:
+            pickle.dump(all_subs[country], shard_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    manifest = {
+        "formatVersion": SNAPSHOT_FORMAT_VERSION,
+        "version": iso3166_2_version,
+        "countries": {country: list(all_subs[country]) for country in all_subs},
+        "hashes": {country: hash_country_data(all_subs[country]) for country in all_subs},
+        "alpha2Codes": sorted(c.alpha_2 for c in countries if hasattr(c, "alpha_2"))
+    }
+
+    #manifest is written last so partially built shards are never used
+    with open(os.path.join(shard_dir, "manifest.json"), 'w', encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file)
+
+    return shard_dir
+
+def convert_alpha_codes(alpha_codes: str) -> list[str]:
+    """
+    Convert one or more comma separated ISO 3166-1 alpha-2, alpha-3 or numeric country codes
+    into a list of their alpha-2 counterparts.
+
+    Parameters
+    ==========
+    :alpha_codes: str
+        one or more comma separated ISO 3166-1 country codes.
+
+    Returns
+    =======
+    :alpha2_codes: list
+        list of converted alpha-2 country codes.
+
+    Raises
+    ======
+    ValueError:
+        Invalid ISO 3166-1 country code input, or country data not available.
+    """
+    alpha2_codes = [Subdivisions.convert_to_alpha2(code) for code in alpha_codes.split(',')]
+    country_codes = get_country_codes()
+    for code in alpha2_codes:
+        if code not in country_codes:
+            raise ValueError(f"Valid alpha-2 code input {code}, but country data not available.")
+    return alpha2_codes
+
+def get_country_subdivisions(alpha_codes: str|list[str]) -> dict:
+    """
+    Return the subdivision data for one or more comma separated ISO 3166-1 alpha-2, alpha-3 
+    or numeric country codes without needing the Subdivisions class instance. A single code 
+    returns the flat {subdiv_code: data} object, multiple codes return the nested 
+    {country_code: {subdiv_code: data}} object.
+
+    Parameters
+    ==========
+    :alpha_codes: str/list
+        one or more comma separated ISO 3166-1 country codes, or list of already converted
+        alpha-2 codes.
+
+    Returns
+    =======
+    :iso3166_2: dict
+        subdivision data for the input country codes.
+
+    Raises
+    ======
+    ValueError:
+        Invalid ISO 3166-1 country code input.
+    """
+    #convert any alpha-3 or numeric codes into their alpha-2 counterpart, raises error if invalid code input
+    alpha2_codes = convert_alpha_codes(alpha_codes) if isinstance(alpha_codes, str) else alpha_codes
+
+    iso3166_2 = {code: get_country_data(code) for code in alpha2_codes}
+    if len(alpha2_codes) == 1:
+        return iso3166_2[alpha2_codes[0]]
+    return iso3166_2
+
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """ Compute the great-circle distance in km between two lat/lng coordinate pairs. """
     r = 6371.0
@@ -144,12 +1332,181 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 
 @app.after_request
 def add_cache_control(response):
-    #add public Cache-Control for successful GET responses returning JSON data
-    if request.method == 'GET' and response.status_code == 200 and 'application/json' in response.content_type:
+    #add public Cache-Control for successful GET responses returning JSON or MessagePack data, which vary by the Accept header
+    if request.method == 'GET' and response.status_code == 200 and response.mimetype in ('application/json', MSGPACK_MIMETYPE):
         response.cache_control.public = True
         response.cache_control.max_age = 3600
+        if msgpack is not None:
+            response.vary.add('Accept')
     return response
 
+def get_request_content_hash(view_args: dict) -> str:
+    """
+    Return the content hash of the data a request can return. Requests for specific country or 
+    subdivision codes are scoped to the content hashes of those countries, so their ETags only 
+    change when those countries' data changes. All other requests, or requests with invalid codes, 
+    use the hash of the whole dataset.
+
+    Parameters
+    ==========
+    :view_args: dict
+        path parameters passed into the endpoint.
+
+    Returns
+    =======
+    :content_hash: str
+        content hash of the requested countries or the whole dataset.
+    """
+    try:
+        if view_args.get("input_alpha"):
+            alpha2_codes = convert_alpha_codes(view_args["input_alpha"].replace("%20", ""))
+        elif view_args.get("input_subdivision"):
+            alpha2_codes = [code.strip().split("-")[0] for code in view_args["input_subdivision"].replace("%20", "").upper().split(",")]
+        else:
+            return get_dataset_hash()
+        return hashlib.sha256(";".join(f"{code}:{get_country_hash(code)}" for code in sorted(set(alpha2_codes))).encode("utf-8")).hexdigest()[:32]
+    except (ValueError, KeyError):
+        return get_dataset_hash()
+
+def normalize_request_params(view_args: dict) -> tuple[tuple, tuple]:
+    """
+    Normalize the path and query string parameters of the current request, so equivalent requests 
+    share the same ETag and response cache entry. Country and subdivision codes are uppercased and 
+    sorted, filter attribute sets are parsed and sorted, the likeness and radius values are parsed 
+    into their numeric value and other query string values are stripped of whitespace. Inputs 
+    whose case or order can affect the output, such as search terms, are kept as is.
+
+    Parameters
+    ==========
+    :view_args: dict
+        path parameters passed into the endpoint.
+
+    Returns
+    =======
+    :normalized_inputs: tuple
+        sorted (name, value) pairs of the normalized path parameters.
+    :normalized_args: tuple
+        sorted (name, values) pairs of the normalized query string parameters.
+    """
+    normalized_inputs = []
+    for key, value in sorted(view_args.items()):
+        if key in ("input_alpha", "input_subdivision"):
+            value = ",".join(sorted(code.replace(" ", "") for code in value.replace("%20", " ").upper().split(",")))
+        normalized_inputs.append((key, value))
+
+    normalized_args = []
+    for key, values in sorted(request.args.lists()):
+        normalized_values = []
+        for value in values:
+            value = value.strip()
+            if key == "filter":
+                attributes = parse_filter_attributes(value)
+                if attributes != -1:
+                    value = ",".join(attributes or ())
+            elif key in ("likeness", "radius"):
+                try:
+                    value = str(int(value.rstrip('/')) if key == "likeness" else float(value.rstrip('/')))
+                except ValueError:
+                    pass
+            normalized_values.append(value)
+        normalized_args.append((key, tuple(normalized_values)))
+
+    return tuple(normalized_inputs), tuple(normalized_args)
+
+def get_request_etag(view_args: dict) -> str:
+    """
+    Return the strong ETag of the current data endpoint request, computed from the package version, 
+    the content hash of the requested countries or whole dataset, the endpoint and its normalized 
+    path and query string parameters.
+
+    Parameters
+    ==========
+    :view_args: dict
+        path parameters passed into the endpoint.
+
+    Returns
+    =======
+    :etag: str
+        ETag of the request.
+    """
+    normalized_inputs, normalized_args = normalize_request_params(view_args)
+    etag_source = "|".join([iso3166_2_version, get_request_content_hash(view_args), request.endpoint, repr(normalized_inputs), repr(normalized_args), 
+                            MSGPACK_MIMETYPE if wants_msgpack() else "application/json"])
+    return hashlib.sha256(etag_source.encode("utf-8")).hexdigest()[:32]
+
+def conditional_etag(view):
+    """
+    Decorator for data endpoints that adds a strong ETag to successful GET responses. If the 
+    request's If-None-Match header matches the ETag then an empty 304 is returned straight 
+    away, without running any lookup, filtering or serialization.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        etag = get_request_etag(kwargs)
+
+        #return empty 304 if client already has the current version of the response
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.cache_control.public = True
+            response.cache_control.max_age = 3600
+            return response
+
+        response = app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and response.get_etag()[0] is None:
+            response.set_etag(etag)
+        return response
+    return wrapper
+
+#cache of successful data endpoint responses, keyed by the normalized endpoint and parameters of each request
+response_cache = ByteSizeLRUCache(RESPONSE_CACHE_MAX_BYTES)
+
+def get_response_cache_key(view_args: dict) -> tuple:
+    """
+    Return the response cache key of the current request from its endpoint, its normalized path 
+    and query string parameters, via normalize_request_params, and whether MessagePack was 
+    negotiated, so equivalent requests share a cache entry.
+
+    Parameters
+    ==========
+    :view_args: dict
+        path parameters passed into the endpoint.
+
+    Returns
+    =======
+    :key: tuple
+        response cache key of the request.
+    """
+    return (request.endpoint, *normalize_request_params(view_args), wants_msgpack())
+
+def cached_response(view):
+    """
+    Decorator for data endpoints that caches successful, non-streamed GET responses in the 
+    byte-size bounded response cache, keyed by the normalized endpoint and parameters of the 
+    request. Cached responses are returned without running the endpoint, with the X-Cache 
+    header set to HIT, else MISS.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+
+        key = get_response_cache_key(kwargs)
+        cached = response_cache.get(key)
+        if cached is not None:
+            body, status, headers = cached
+            response = Response(body, status=status, headers=headers)
+            response.headers['X-Cache'] = 'HIT'
+            return response
+
+        response = app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and not response.is_streamed:
+            body = response.get_data()
+            response_cache.set(key, (body, response.status_code, list(response.headers)), len(body))
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
 @app.route('/')
 @app.route('/api')
 def home() -> str:
@@ -170,6 +1527,7 @@ def home() -> str:
 
 @app.route('/api/all', methods=['GET'])
 @app.route('/all', methods=['GET'])
+@conditional_etag
 def all() -> tuple[dict, int]:
     """
     Flask route for '/api/all' path/endpoint. Return all ISO 3166-2 subdivision data 
@@ -189,55 +1547,62 @@ def all() -> tuple[dict, int]:
         response status code. 200 is a successful response, 400 means there was an 
         invalid parameter input. 
     """  
+    #return the pre-serialized and precompressed response if no query string params input
+    if not request.args and not wants_msgpack():
+        return make_precompressed_response(get_all_response_cache())
+
     #parse filter query string param
     filter_param = request.args.get('filter')
 
     #parse limit parameter
     limit_param = request.args.get('limit')
 
-    #get cached subdivision data
-    all_iso3166_2_ = get_all_subdivisions()
+    #get alpha-2 codes of all countries in the dataset
+    country_codes = get_country_codes()
 
-    #filter out attributes from filter query parameter, if applicable 
+    #validate attributes from filter query parameter, if applicable 
+    attributes = None
     if not (filter_param is None):
-        all_iso3166_2_ = filter_attributes(filter_param, get_all_subdivisions())
-        if (all_iso3166_2_ == -1):
+        attributes = parse_filter_attributes(filter_param)
+        if (attributes == -1):
             return jsonify(create_error_message(f'Invalid attribute name input to filter query string parameter: {filter_param}. Refer to the list of supported attributes: {", ".join(all_attributes)}.', request.url)), 400   
 
     #limit number of countries returned, if applicable due to large amount of country data
+    try:
+        limit_param = parse_limit_param(limit_param)
+    except ValueError as ve:
+        return jsonify(create_error_message(str(ve), request.url)), 400
     if not (limit_param is None):
-        try:
-            limit_param = int(limit_param)
-        except ValueError:
-            return jsonify(create_error_message("Limit query string parameter must be an integer.", request.url)), 400 
+        #slice the country codes to only return the number of countries specified in limit param
+        country_codes = country_codes[:limit_param]
 
-        if (limit_param < 1):
-            return jsonify(create_error_message("Limit query string parameter must be greater than 0.", request.url)), 400 
-
-        #slice the dict to only return the number of countries specified in limit param
-        all_iso3166_2_ = dict(list(all_iso3166_2_.items())[:limit_param])
-
-    #parse lang query string param and filter localOtherName to the requested language
+    #parse lang query string param
     lang_param = request.args.get('lang')
     if lang_param:
         lang_param = lang_param.strip()
         if not re.match(r'^[a-zA-Z0-9]{2,10}$', lang_param):
             return jsonify(create_error_message("lang query string parameter must be an ISO 639 language code (2–10 alphanumeric characters).", request.url)), 400
-        all_iso3166_2_ = filter_lang_local_name(all_iso3166_2_, lang_param)
 
     #parse format query string param
     format_param = request.args.get('format', 'json').lower().strip()
-    if format_param not in ('json', 'csv', 'geojson'):
-        return jsonify(create_error_message(f"Unsupported format '{format_param}'. Supported formats: json, csv, geojson.", request.url)), 400
-
-    #return non-JSON format if requested (bypasses pagination)
-    if format_param != 'json':
-        return make_format_response(all_iso3166_2_, format_param)
-
-    #parse pagination params — only active when page or pageSize is explicitly provided
+    if format_param not in supported_formats:
+        return jsonify(create_error_message(f"Unsupported format '{format_param}'. Supported formats: {', '.join(supported_formats)}.", request.url)), 400
+    format_param = parse_encoding_param(format_param)
+    if (format_param == -1):
+        return jsonify(create_error_message(f"Unsupported encoding '{request.args.get('encoding')}'. Supported encodings: {', '.join(supported_encodings)}.", request.url)), 400
+
+    #parse cursor query string param, paginating by subdivision rather than by country when provided
+    cursor_param = request.args.get('cursor')
+    if format_param == 'json' and cursor_param is not None:
+        offset = decode_cursor(cursor_param)
+        if (offset == -1):
+            return jsonify(create_error_message("Invalid or expired cursor query string parameter, use the nextCursor value of the previous page or an empty cursor for the first page.", request.url)), 400
+
+    #parse pagination params — only active when page, pageSize or cursor is explicitly provided
     page_param = request.args.get('page')
     page_size_param = request.args.get('pageSize')
-    if page_param is not None or page_size_param is not None:
+    paginate = format_param == 'json' and (page_param is not None or page_size_param is not None or cursor_param is not None)
+    if paginate:
         try:
             page = int(page_param or 1)
             page_size = int(page_size_param or 50)
@@ -247,12 +1612,53 @@ def all() -> tuple[dict, int]:
             return jsonify(create_error_message("page must be greater than 0.", request.url)), 400
         if not (1 <= page_size <= 250):
             return jsonify(create_error_message("pageSize must be between 1 and 250.", request.url)), 400
+
+    #return the page of subdivisions following the cursor, if applicable
+    if paginate and cursor_param is not None:
+        return make_cursor_page_response(offset, page_size, len(country_codes), attributes, lang_param)
+
+    #return the prebuilt Arrow or Parquet file of the full dataset, if applicable
+    if format_param in arrow_mimetypes and attributes is None and limit_param is None and not lang_param:
+        return make_arrow_response(get_arrow_file(format_param), format_param)
+
+    #parse stream query string param, unpaginated JSON is streamed by default unless set to 0
+    stream = request.args.get('stream', '1').lower().rstrip('/') in ['true', '1', 'yes']
+
+    #return the cached pre-serialized response of the full dataset filtered to the attribute set, if applicable
+    if format_param == 'json' and attributes is not None and limit_param is None and not lang_param and not paginate and not wants_msgpack():
+        return make_precompressed_response(get_projection_response_cache(attributes))
+
+    #stream the JSON response one country at a time, if applicable
+    if format_param == 'json' and not paginate and stream:
+        return make_streaming_response(country_codes, attributes, lang_param)
+
+    #join the cached per-country JSON fragments if no further processing of the data is required
+    if format_param == 'json' and not lang_param and not paginate:
+        return make_fragments_response(country_codes, attributes)
+
+    #stream the NDJSON records one country at a time, if applicable
+    if format_param == 'ndjson':
+        return make_ndjson_response(country_codes, attributes, lang_param)
+
+    #get cached subdivision data, projected to the attributes from filter query parameter, if applicable
+    all_iso3166_2_ = {code: get_country_projection(code, attributes) for code in country_codes}
+
+    #filter localOtherName to the requested language, if applicable
+    if lang_param:
+        all_iso3166_2_ = filter_lang_local_name(all_iso3166_2_, lang_param)
+
+    #return non-JSON format if requested (bypasses pagination)
+    if format_param != 'json':
+        return make_format_response(all_iso3166_2_, format_param)
+
+    #paginate the countries, if applicable
+    if paginate:
         all_keys = list(all_iso3166_2_.keys())
         total_countries = len(all_keys)
         total_pages = ceil(total_countries / page_size)
         start = (page - 1) * page_size
         page_data = {k: all_iso3166_2_[k] for k in all_keys[start:start + page_size]}
-        return jsonify({
+        return jsonify_data({
             "data": page_data,
             "page": page,
             "pageSize": page_size,
@@ -260,12 +1666,14 @@ def all() -> tuple[dict, int]:
             "totalCountries": total_countries
         }), 200
 
-    return jsonify(all_iso3166_2_), 200
+    return jsonify_data(all_iso3166_2_), 200
 
 @app.route('/alpha', methods=['GET'])
 @app.route('/api/alpha', methods=['GET'])
 @app.route('/api/alpha/<input_alpha>', methods=['GET'])
 @app.route('/alpha/<input_alpha>', methods=['GET'])
+@conditional_etag
+@cached_response
 def api_alpha(input_alpha: str="") -> tuple[dict, int]:
     """
     Flask route for '/api/alpha' path/endpoint. Return all ISO 3166-2 subdivision data for the 
@@ -296,9 +1704,10 @@ def api_alpha(input_alpha: str="") -> tuple[dict, int]:
     #remove unicode spacing from input alpha code if applicable
     input_alpha = input_alpha.replace("%20", '')
 
-    #get the country subdivision data using the input alpha codes from the Subdivisions class, return error if invalid codes input
+    #get the country subdivision data using the input alpha codes, return error if invalid codes input
     try:
-        iso3166_2 = get_subdivision_instance()[input_alpha]
+        alpha2_codes = convert_alpha_codes(input_alpha)
+        iso3166_2 = get_country_subdivisions(alpha2_codes)
     except ValueError as ve:
         error_msg = str(ve)
         if '. Did you mean' in error_msg:
@@ -308,23 +1717,14 @@ def api_alpha(input_alpha: str="") -> tuple[dict, int]:
     #parse filter query string param
     filter_param = request.args.get('filter')
 
-    #filter out attributes from filter query parameter, if applicable 
+    #validate attributes from filter query parameter, if applicable 
+    attributes = None
     if not (filter_param is None):
-        iso3166_2 = filter_attributes(filter_param, iso3166_2)
-        if (iso3166_2 == -1):
+        attributes = parse_filter_attributes(filter_param)
+        if (attributes == -1):
             return jsonify(create_error_message(f'Invalid attribute name input to filter query string parameter: {filter_param}. Refer to the list of supported attributes: {", ".join(all_attributes)}.', request.url)), 400
 
-    #detect if data is flat {subdiv_code: data} (single country) or nested {country_code: {subdiv_code: data}} (multi-country)
-    #single-country results have subdivision codes (containing '-') as top-level keys; multi-country results have alpha-2 codes
-    first_key = next(iter(iso3166_2), None)
-    is_flat = bool(first_key and '-' in first_key)
-    if is_flat:
-        country_alpha2 = first_key.split('-')[0]
-        iso3166_2_nested = {country_alpha2: dict(iso3166_2)}
-    else:
-        iso3166_2_nested = dict(iso3166_2)
-
-    #parse lang query string param and filter localOtherName to the requested language
+    #parse lang query string param
     lang_param = request.args.get('lang')
     if lang_param:
         lang_param = lang_param.strip()
@@ -332,24 +1732,47 @@ def api_alpha(input_alpha: str="") -> tuple[dict, int]:
             return jsonify(create_error_message("lang query string parameter must be an ISO 639 language code (2–10 alphanumeric characters).", request.url)), 400
         if not (pycountry_languages.get(alpha_3=lang_param.lower()) or pycountry_languages.get(alpha_2=lang_param.lower())):
             return jsonify(create_error_message(f"Unrecognized ISO 639 language code: {lang_param}.", request.url)), 400
-        iso3166_2_nested = filter_lang_local_name(iso3166_2_nested, lang_param)
 
     #parse format query string param
     format_param = request.args.get('format', 'json').lower().strip()
-    if format_param not in ('json', 'csv', 'geojson'):
-        return jsonify(create_error_message(f"Unsupported format '{format_param}'. Supported formats: json, csv, geojson.", request.url)), 400
+    if format_param not in supported_formats:
+        return jsonify(create_error_message(f"Unsupported format '{format_param}'. Supported formats: {', '.join(supported_formats)}.", request.url)), 400
+    format_param = parse_encoding_param(format_param)
+    if (format_param == -1):
+        return jsonify(create_error_message(f"Unsupported encoding '{request.args.get('encoding')}'. Supported encodings: {', '.join(supported_encodings)}.", request.url)), 400
+
+    #a single country input returns the flat {subdiv_code: data} object, multiple countries the nested {country_code: {subdiv_code: data}} object
+    is_flat = len(alpha2_codes) == 1
+
+    #join the cached per-country JSON fragments if no further processing of the data is required
+    if format_param == 'json' and not lang_param:
+        return make_fragments_response(alpha2_codes, attributes, nested=not is_flat)
+
+    #stream the NDJSON records one country at a time, if applicable
+    if format_param == 'ndjson':
+        return make_ndjson_response(alpha2_codes, attributes, lang_param)
+
+    #get cached subdivision data, projected to the attributes from filter query parameter, if applicable 
+    iso3166_2_nested = {code: get_country_projection(code, attributes) for code in alpha2_codes}
+
+    #filter localOtherName to the requested language, if applicable
+    if lang_param:
+        iso3166_2_nested = filter_lang_local_name(iso3166_2_nested, lang_param)
+
     if format_param != 'json':
         return make_format_response(iso3166_2_nested, format_param)
 
     #unwrap back to flat format for single-country JSON responses
     if is_flat:
-        return jsonify(iso3166_2_nested[country_alpha2]), 200
-    return jsonify(iso3166_2_nested), 200
+        return jsonify_data(iso3166_2_nested[alpha2_codes[0]]), 200
+    return jsonify_data(iso3166_2_nested), 200
 
 @app.route('/api/subdivision/<input_subdivision>', methods=['GET'])
 @app.route('/subdivision/<input_subdivision>', methods=['GET'])
 @app.route('/api/subdivision', methods=['GET'])
 @app.route('/subdivision', methods=['GET'])
+@conditional_etag
+@cached_response
 def api_subdivision(input_subdivision="") -> tuple[dict, int]:    
     """
     Flask route for '/api/subdivision' path/endpoint. Return all ISO 3166-2 subdivision data 
@@ -401,7 +1824,7 @@ def api_subdivision(input_subdivision="") -> tuple[dict, int]:
 
         #add country code as parent key for nested subdivision objects
         cc = subd.split('-')[0]
-        iso3166_2.setdefault(cc, {})[subd] = get_all_subdivisions()[cc][subd]
+        iso3166_2.setdefault(cc, {})[subd] = get_country_data(cc)[subd]
 
     #parse filter query string param
     filter_param = request.args.get('filter')
@@ -422,17 +1845,21 @@ def api_subdivision(input_subdivision="") -> tuple[dict, int]:
 
     #parse format query string param
     format_param = request.args.get('format', 'json').lower().strip()
-    if format_param not in ('json', 'csv', 'geojson'):
-        return jsonify(create_error_message(f"Unsupported format '{format_param}'. Supported formats: json, csv, geojson.", request.url)), 400
+    if format_param not in supported_formats:
+        return jsonify(create_error_message(f"Unsupported format '{format_param}'. Supported formats: {', '.join(supported_formats)}.", request.url)), 400
+    format_param = parse_encoding_param(format_param)
+    if (format_param == -1):
+        return jsonify(create_error_message(f"Unsupported encoding '{request.args.get('encoding')}'. Supported encodings: {', '.join(supported_encodings)}.", request.url)), 400
     if format_param != 'json':
         return make_format_response(iso3166_2, format_param)
 
-    return jsonify(iso3166_2), 200
+    return jsonify_data(iso3166_2), 200
 
 @app.route('/api/search/<input_search_term>', methods=['GET'])
 @app.route('/search/<input_search_term>', methods=['GET'])
 @app.route('/api/search', methods=['GET'])
 @app.route('/search', methods=['GET'])
+@cached_response
 def api_search(input_search_term: str="") -> tuple[dict, int]:
     """
     Flask route for '/api/search' path/endpoint. Return all ISO 3166-2 subdivision data attributes and 
@@ -482,11 +1909,32 @@ def api_search(input_search_term: str="") -> tuple[dict, int]:
     #parse query string parameter that allows user to include the Matching % score from search results, by default it is excluded in results
     exclude_match_score = (request.args.get('excludeMatchScore') or request.args.get('excludematchscore') or "true").lower().rstrip('/') in ['true', '1', 'yes']
 
-    #call search function in iso3166-updates package, passing in likeness score & excludeMatchScore parameters, by default also search over the localOtherName attribute
-    search_results = get_subdivision_instance().search(search_terms, likeness_score=search_likeness_score, exclude_match_score=exclude_match_score, local_other_name_search=True)
+    #parse limit & offset query string params, used to return a page of the best matching search results, raise error if invalid type or value input
+    limit_param, offset_param = request.args.get('limit'), request.args.get('offset')
+    paginate = limit_param is not None or offset_param is not None
+    if paginate:
+        try:
+            limit_param = parse_limit_param(limit_param, SEARCH_LIMIT, SEARCH_MAX_LIMIT)
+        except ValueError as ve:
+            return jsonify(create_error_message(str(ve), request.url)), 400
+        try:
+            offset_param = int((offset_param or "0").rstrip('/'))
+        except ValueError:
+            return jsonify(create_error_message("Offset query string parameter must be an integer.", request.url)), 400
+        if offset_param < 0:
+            return jsonify(create_error_message("Offset query string parameter must be 0 or greater.", request.url)), 400
+
+    #search the subdivision names & local/other names via the n-gram search index, passing in likeness score, excludeMatchScore & page parameters
+    search_results = search_subdivisions(search_terms, likeness_score=search_likeness_score, exclude_match_score=exclude_match_score,
+                                         limit=limit_param if paginate else None, offset=offset_param if paginate else 0)
+
+    #unwrap the page of search results from its envelope, if applicable
+    search_page = None
+    if paginate:
+        search_page, search_results = search_results, search_results["data"]
 
     #return message that no search results were found
-    if not search_results:
+    if not search_results and not (search_page and search_page["totalMatches"]):
         return jsonify({"Message": f"No matching subdivision data found with the given search term(s): {search_terms}. Try using the query string parameter '?likeness' and reduce the likeness score to expand the search space, '?likeness=30' will return subdivision data that have a 30% match to the input name. The current likeness score is set to {search_likeness_score}."}), 200
 
     #parse filter query string param
@@ -512,17 +1960,31 @@ def api_search(input_search_term: str="") -> tuple[dict, int]:
     #parse format query string param — only applies for nested dict format
     if isinstance(search_results, dict):
         format_param = request.args.get('format', 'json').lower().strip()
-        if format_param not in ('json', 'csv', 'geojson'):
-            return jsonify(create_error_message(f"Unsupported format '{format_param}'. Supported formats: json, csv, geojson.", request.url)), 400
+        if format_param not in supported_formats:
+            return jsonify(create_error_message(f"Unsupported format '{format_param}'. Supported formats: {', '.join(supported_formats)}.", request.url)), 400
+        format_param = parse_encoding_param(format_param)
+        if (format_param == -1):
+            return jsonify(create_error_message(f"Unsupported encoding '{request.args.get('encoding')}'. Supported encodings: {', '.join(supported_encodings)}.", request.url)), 400
         if format_param != 'json':
-            return make_format_response(search_results, format_param)
+            format_response = make_format_response(search_results, format_param)
+            #non-JSON formats have no envelope, so the page's total number of matches, limit & offset are sent as headers
+            if paginate:
+                format_response.headers["X-Total-Count"] = str(search_page["totalMatches"])
+                format_response.headers["X-Limit"] = str(search_page["limit"])
+                format_response.headers["X-Offset"] = str(search_page["offset"])
+            return format_response
+
+    #return the page of search results with the total number of matches, if applicable
+    if paginate:
+        return jsonify_data({**search_page, "data": search_results}), 200
 
-    return jsonify(search_results), 200
+    return jsonify_data(search_results), 200
 
 @app.route('/api/search_geo/<input_latlng>', methods=['GET'])
 @app.route('/search_geo/<input_latlng>', methods=['GET'])
 @app.route('/api/search_geo', methods=['GET'])
 @app.route('/search_geo', methods=['GET'])
+@cached_response
 def api_search_geo(input_latlng: str="") -> tuple[dict, int]:
     """
     Flask route for '/api/search_geo' path/endpoint. Return ISO 3166-2 subdivision data
@@ -607,12 +2069,14 @@ def api_search_geo(input_latlng: str="") -> tuple[dict, int]:
 
         matched_subdivisions = filtered_subdivisions
 
-    return jsonify(matched_subdivisions), 200
+    return jsonify_data(matched_subdivisions), 200
 
 @app.route('/api/country_name/<input_country_name>', methods=['GET'])
 @app.route('/country_name/<input_country_name>', methods=['GET'])
 @app.route('/api/country_name', methods=['GET'])
 @app.route('/country_name', methods=['GET'])
+@conditional_etag
+@cached_response
 def api_country_name(input_country_name="") -> tuple[dict, int]:
     """
     Flask route for '/api/country_name' path/endpoint. Return all ISO 3166-2 subdivision data attributes and 
@@ -652,77 +2116,60 @@ def api_country_name(input_country_name="") -> tuple[dict, int]:
     else:
         names = sorted(name.split(','))
 
-    #convert country names using module-level alias map, if applicable
-    for name_ in range(0, len(names)):
-        if names[name_].title() in NAME_CONVERTED:
-            names[name_] = NAME_CONVERTED[names[name_].title()]
-
-    #remove all whitespace in any of the country names
-    names = [name_.strip(' ') for name_ in names]
-
-    #get list of available country names from pycountry, remove whitespace
-    all_names_no_space = [country.name.strip(' ') for country in countries]
-    
-    #iterate over all input country names, get corresponding 2 letter alpha-2 code
+    #resolve each country name, alias or code into its alpha-2 code via the resolver index, return error if no country found
     for name_ in names:
-
-        #using thefuzz library, get all countries that match the input country name
-        all_country_name_matches = process.extract(name_.upper(), all_names_no_space)
-        name_matches = []
-        
-        #iterate over all found country matches, look for exact matches, if none found then look for ones that have likeness score>=90
-        for match in all_country_name_matches:
-            #use default likeness score of 100 (exact) followed by 90 if no exact matches found
-            if (match[1] == 100):
-                name_matches.append(match[0])
-                break
-            elif (match[1] >= 90):
-                name_matches.append(match[0])
-                break
-            else:
-                #return error if country name not found
-                return jsonify(create_error_message(f"Invalid country name input: {name}.", request.url)), 400             
-
-        #use pycountry to find corresponding alpha-2 code from its name
-        country_match = countries.get(name=name_matches[0])
-        if country_match is None:
+        country_code = resolve_country_name(name_.strip(' '))
+        if country_code is None:
             return jsonify(create_error_message(f"Invalid country name input: {name}.", request.url)), 400
-        alpha2_code.append(country_match.alpha_2)
+        alpha2_code.append(country_code)
     
-    #get country data from ISO 3166-2 object, using alpha-2 code
-    for code in alpha2_code:
-        iso3166_2[code] = get_all_subdivisions()[code]
-
     #parse filter query string param
     filter_param = request.args.get('filter')
 
-    #filter out attributes from filter query parameter, if applicable 
+    #validate attributes from filter query parameter, if applicable 
+    attributes = None
     if not (filter_param is None):
-        iso3166_2 = filter_attributes(filter_param, iso3166_2)
-        if (iso3166_2 == -1):
+        attributes = parse_filter_attributes(filter_param)
+        if (attributes == -1):
             return jsonify(create_error_message(f'Invalid attribute name input to filter query string parameter: {filter_param}. Refer to the list of supported attributes: {", ".join(all_attributes)}.', request.url)), 400             
 
-    #parse lang query string param and filter localOtherName to the requested language
+    #parse lang query string param
     lang_param = request.args.get('lang')
     if lang_param:
         lang_param = lang_param.strip()
         if not re.match(r'^[a-zA-Z0-9]{2,10}$', lang_param):
             return jsonify(create_error_message("lang query string parameter must be an ISO 639 language code (2–10 alphanumeric characters).", request.url)), 400
-        iso3166_2 = filter_lang_local_name(iso3166_2, lang_param)
 
     #parse format query string param
     format_param = request.args.get('format', 'json').lower().strip()
-    if format_param not in ('json', 'csv', 'geojson'):
-        return jsonify(create_error_message(f"Unsupported format '{format_param}'. Supported formats: json, csv, geojson.", request.url)), 400
+    if format_param not in supported_formats:
+        return jsonify(create_error_message(f"Unsupported format '{format_param}'. Supported formats: {', '.join(supported_formats)}.", request.url)), 400
+    format_param = parse_encoding_param(format_param)
+    if (format_param == -1):
+        return jsonify(create_error_message(f"Unsupported encoding '{request.args.get('encoding')}'. Supported encodings: {', '.join(supported_encodings)}.", request.url)), 400
+
+    #join the cached per-country JSON fragments if no further processing of the data is required
+    if format_param == 'json' and not lang_param:
+        return make_fragments_response(alpha2_code, attributes)
+
+    #get cached country data using alpha-2 code, projected to the attributes from filter query parameter, if applicable
+    for code in alpha2_code:
+        iso3166_2[code] = get_country_projection(code, attributes)
+
+    #filter localOtherName to the requested language, if applicable
+    if lang_param:
+        iso3166_2 = filter_lang_local_name(iso3166_2, lang_param)
+
     if format_param != 'json':
         return make_format_response(iso3166_2, format_param)
 
-    return jsonify(iso3166_2), 200
+    return jsonify_data(iso3166_2), 200
 
 @app.route('/api/list_subdivisions', methods=['GET'])
 @app.route('/list_subdivisions', methods=['GET'])
 @app.route('/api/list_subdivisions/<input_alpha>', methods=['GET'])
 @app.route('/list_subdivisions/<input_alpha>', methods=['GET'])
+@conditional_etag
 def api_list_subdivisions(input_alpha: str="") -> tuple[dict, int]:
     """
     Flask route for '/api/list_subdivisions' path/endpoint. Return all ISO 3166 country codes and 
@@ -760,7 +2207,165 @@ def api_list_subdivisions(input_alpha: str="") -> tuple[dict, int]:
         except ValueError as ve:
             return jsonify(create_error_message(str(ve), request.url)), 400   
 
-    return jsonify(iso3166_2), 200
+    return jsonify_data(iso3166_2), 200
+
+@app.route('/api/languages', methods=['GET'])
+@app.route('/languages', methods=['GET'])
+@app.route('/api/languages/<input_alpha>', methods=['GET'])
+@app.route('/languages/<input_alpha>', methods=['GET'])
+@conditional_etag
+def api_languages(input_alpha: str="") -> tuple[dict, int]:
+    """
+    Flask route for '/api/languages' path/endpoint. Return all ISO 3166 country codes and a list 
+    of the ISO 639 language codes their subdivisions have local/other names in, as supported by 
+    the lang query string parameter. A comma separated list of individual ISO 3166 country codes 
+    can also be input.
+
+    Parameters
+    ==========
+    :input_alpha: str (default="")
+        2 letter alpha-2, 3 letter alpha-3 or numeric ISO 3166-1 country codes or list of codes.
+
+    Returns
+    =======
+    :iso3166_2: json
+        jsonified response of iso3166-2 country codes and their local/other name languages.
+    :status_code: int
+        response status code. 200 is a successful response, 400 means there was an 
+        invalid parameter input. 
+    """
+    #remove unicode spacing from input alpha code if applicable
+    input_alpha = input_alpha.replace("%20", '')
+
+    #get all country codes or convert the input alpha codes, return error if invalid codes input
+    if (input_alpha == ""):
+        alpha2_codes = get_country_codes()
+    else:
+        try:
+            alpha2_codes = convert_alpha_codes(input_alpha)
+        except ValueError as ve:
+            error_msg = str(ve)
+            if '. Did you mean' in error_msg:
+                error_msg = error_msg[:error_msg.index('. Did you mean')] + '.'
+            return jsonify(create_error_message(error_msg, request.url)), 400
+
+    #get languages of each country from the inverted language index
+    iso3166_2 = {code: [] for code in alpha2_codes}
+    for lang, countries_ in get_language_index().items():
+        for code in countries_:
+            if code in iso3166_2:
+                iso3166_2[code].append(lang)
+
+    return jsonify_data(iso3166_2), 200
+
+@app.route('/api/autocomplete/<input_prefix>', methods=['GET'])
+@app.route('/autocomplete/<input_prefix>', methods=['GET'])
+@app.route('/api/autocomplete', methods=['GET'])
+@app.route('/autocomplete', methods=['GET'])
+@conditional_etag
+def api_autocomplete(input_prefix: str="") -> tuple[dict, int]:
+    """
+    Flask route for '/api/autocomplete' path/endpoint. Return the codes and names of the 
+    subdivisions whose name or a local/other name starts with the input prefix, ignoring case 
+    and accents, for type-ahead inputs. Rather than the fuzzy search of /api/search, matches 
+    are looked up in a sorted index of the names. The results can be scoped to one or more 
+    countries via the 'country' query string parameter and their number set via the 'limit' 
+    query string parameter.
+
+    Parameters
+    ==========
+    :input_prefix: str (default="")
+        start of the sought subdivision name.
+
+    Returns
+    =======
+    :iso3166_2: json
+        jsonified response of the matching subdivision codes and names.
+    :status_code: int
+        response status code. 200 is a successful response, 400 means there was an 
+        invalid parameter input. 
+    """
+    #return error if no prefix input
+    prefix = unquote(input_prefix).replace("%20", " ")
+    if not normalize_autocomplete_name(prefix):
+        return jsonify(create_error_message("The autocomplete input parameter cannot be empty. Please pass in the start of a subdivision name.", request.url)), 400
+
+    #parse limit query string param, return error if invalid type or value input
+    try:
+        limit = parse_limit_param(request.args.get('limit'), AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError as ve:
+        return jsonify(create_error_message(str(ve), request.url)), 400
+
+    #parse country query string param into alpha-2 codes, return error if invalid codes input
+    country_param = request.args.get('country', '').replace("%20", '').rstrip('/')
+    alpha2_codes = None
+    if country_param:
+        try:
+            alpha2_codes = convert_alpha_codes(country_param)
+        except ValueError as ve:
+            error_msg = str(ve)
+            if '. Did you mean' in error_msg:
+                error_msg = error_msg[:error_msg.index('. Did you mean')] + '.'
+            return jsonify(create_error_message(error_msg, request.url)), 400
+
+    return jsonify_data(autocomplete_subdivisions(prefix, alpha2_codes, limit)), 200
+
+@app.route('/api/sync', methods=['GET', 'POST'])
+@app.route('/sync', methods=['GET', 'POST'])
+def api_sync() -> tuple[dict, int]:
+    """
+    Flask route for '/api/sync' path/endpoint. Incremental sync of the ISO 3166-2 dataset, 
+    returning only the countries whose subdivision data has changed compared to the client's 
+    copy, using the per-country content hashes. The client either POSTs its map of country 
+    code to content hash, or passes the dataset version it has via the 'since' query string 
+    parameter (GET).
+
+    Request body
+    ============
+    {
+        "hashes": {"AD": "<hash>", "AE": "<hash>", ...}
+    }
+
+    Returns
+    =======
+    :jsonify(sync): json
+        jsonified object of the current version and dataset hash, the changed countries' 
+        subdivision data and content hashes and the alpha-2 codes of any removed countries.
+    :status_code: int
+        response status code. 200 is a successful response, 400 means there was an
+        invalid parameter input.
+    """
+    if request.method == 'POST':
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict) or not isinstance(body.get('hashes'), dict):
+            return jsonify(create_error_message(
+                "Request body must be valid JSON with a 'hashes' field containing an object of country codes to content hashes.",
+                request.url)), 400
+        client_hashes = body['hashes']
+        if any(not isinstance(country, str) or not isinstance(country_hash, str) for country, country_hash in client_hashes.items()):
+            return jsonify(create_error_message("All country codes and content hashes must be strings.", request.url)), 400
+        client_hashes = {country.upper().strip(): country_hash for country, country_hash in client_hashes.items()}
+    else:
+        since_param = request.args.get('since', '').strip().rstrip('/')
+        if (since_param == ""):
+            return jsonify(create_error_message(
+                "The since query string parameter, the dataset version to sync from, is required. Alternatively POST a 'hashes' object of country codes to content hashes.",
+                request.url)), 400
+        client_hashes = get_version_hashes(since_param)
+        if client_hashes is None:
+            return jsonify(create_error_message(f"Content hashes for dataset version {since_param} not available, POST the 'hashes' of your copy instead.", request.url)), 400
+
+    #get the countries whose content hash differs to the client's, including any new countries
+    country_hashes = get_country_hashes()
+    changed = [country for country in country_hashes if client_hashes.get(country) != country_hashes[country]]
+
+    return jsonify_data({
+        "version": iso3166_2_version,
+        "datasetHash": get_dataset_hash(),
+        "changed": {country: get_country_data(country) for country in changed},
+        "hashes": {country: country_hashes[country] for country in changed},
+        "removed": sorted(country for country in client_hashes if country not in country_hashes)
+    }), 200
 
 @app.errorhandler(404)
 def not_found(e) -> tuple[dict, int]:
@@ -829,15 +2434,6 @@ def filter_attributes(filter_list: str, filtered_iso3166_2: dict, exclude_match_
     
     filter_list = temp_filter
 
-    #recursive function that recursively removes any unwanted attributes per subdivision object
-    def filter_dict(d, attributes_to_keep):
-        if isinstance(d, dict):
-            return {k: filter_dict(v, attributes_to_keep) for k, v in d.items() if k in attributes_to_keep or isinstance(v, dict)}
-        elif isinstance(d, list):
-            return [filter_dict(i, attributes_to_keep) for i in d]
-        else:
-            return d
-    
     #if the Match score and its attributes are to be included in output, add them to filter list
     if not (exclude_match_score):
         filter_list.extend(["matchScore", "countryCode", "subdivisionCode"])
@@ -849,6 +2445,128 @@ def filter_attributes(filter_list: str, filtered_iso3166_2: dict, exclude_match_
     
     return filtered_iso3166_2
 
+def filter_dict(d: dict|list, attributes_to_keep: set) -> dict|list:
+    """ Recursive function that recursively removes any unwanted attributes per subdivision object. """
+    if isinstance(d, dict):
+        return {k: filter_dict(v, attributes_to_keep) for k, v in d.items() if k in attributes_to_keep or isinstance(v, dict)}
+    elif isinstance(d, list):
+        return [filter_dict(i, attributes_to_keep) for i in d]
+    else:
+        return d
+
+def parse_filter_attributes(filter_list: str) -> tuple[str]|None|int:
+    """
+    Parse and validate the filter query string parameter into a hashable, sorted tuple of the 
+    attributes to keep, following the same rules as filter_attributes.
+
+    Parameters
+    ==========
+    :filter_list: str
+        list of attributes to include for each subdivision.
+
+    Returns
+    =======
+    :attributes/None/-1: tuple/None/int
+        sorted tuple of attributes to keep, None if no attribute value input so the data 
+        isn't filtered, or -1 if an invalid attribute is input to query parameter.
+    """
+    filter_list = filter_list.replace(' ', '').split(',')
+    if (filter_list == ['']):
+        return None
+    if ("*" in filter_list):
+        return tuple(sorted(all_attributes))
+    if any(attr not in all_attributes and attr != '' for attr in filter_list):
+        return -1
+    return tuple(sorted({attr for attr in filter_list if attr != ''}))
+
+def wants_msgpack() -> bool:
+    """ 
+    Return whether the current request negotiated a MessagePack response, via ?format=msgpack 
+    or an Accept header preferring application/msgpack when no format is input. 
+    """
+    if msgpack is None or not has_request_context():
+        return False
+    format_param = request.args.get('format')
+    if format_param is not None:
+        return format_param.lower().strip() == 'msgpack'
+    return request.accept_mimetypes.best_match(["application/json", MSGPACK_MIMETYPE, "application/x-msgpack"]) in (MSGPACK_MIMETYPE, "application/x-msgpack")
+
+def dumps_msgpack(data) -> bytes:
+    """ Serialize object into MessagePack bytes. """
+    return msgpack.packb(data, use_bin_type=True)
+
+def jsonify_data(*args, **kwargs) -> Response:
+    """ 
+    Serialize the data payload of an endpoint as jsonify does, or as MessagePack if negotiated by 
+    the request. Error and informational messages use jsonify so they're always JSON. 
+    """
+    if wants_msgpack():
+        return Response(dumps_msgpack(app.json._prepare_response_obj(args, kwargs)), mimetype=MSGPACK_MIMETYPE)
+    return jsonify(*args, **kwargs)
+
+def parse_encoding_param(format_param: str) -> str|int:
+    """
+    Parse the encoding query string parameter of JSON responses. If the columnar encoding is
+    requested for a JSON response then 'columnar' is returned as the output format to use, 
+    otherwise the input format is returned unchanged. The msgpack format is the JSON output 
+    serialized as MessagePack, so is returned as 'json'.
+
+    Parameters
+    ==========
+    :format_param: str
+        validated format query string parameter.
+
+    Returns
+    =======
+    :format_param/-1: str/int
+        output format to use, or -1 if an invalid encoding is input.
+    """
+    if format_param == 'msgpack':
+        format_param = 'json'
+    encoding_param = request.args.get('encoding')
+    if encoding_param is None:
+        return format_param
+    encoding_param = encoding_param.lower().strip().rstrip('/')
+    if encoding_param not in supported_encodings:
+        return -1
+    return encoding_param if format_param == 'json' else format_param
+
+def parse_limit_param(limit_param: str|None, default: int|None=None, max_limit: int|None=None) -> int|None:
+    """
+    Parse a limit query string parameter into an integer between 1 and the maximum limit, if 
+    applicable, returning the default if no limit is input.
+
+    Parameters
+    ==========
+    :limit_param: str/None
+        limit query string parameter.
+    :default: int/None (default=None)
+        limit to use if no limit is input.
+    :max_limit: int/None (default=None)
+        maximum limit allowed, else there's no maximum.
+
+    Returns
+    =======
+    :limit: int/None
+        parsed limit, or the default if no limit is input.
+
+    Raises
+    ======
+    ValueError:
+        limit isn't an integer, or isn't between 1 and the maximum limit.
+    """
+    if limit_param is None:
+        return default
+    try:
+        limit = int(limit_param.strip().rstrip('/'))
+    except ValueError:
+        raise ValueError("Limit query string parameter must be an integer.") from None
+    if max_limit is None and limit < 1:
+        raise ValueError("Limit query string parameter must be greater than 0.")
+    if max_limit is not None and not (1 <= limit <= max_limit):
+        raise ValueError(f"Limit query string parameter must be between 1 and {max_limit}.")
+    return limit
+
 def create_error_message(message: str, path: str, status: int = 400) -> dict:
     """ Helper function that returns error message when one occurs in Flask app. """
     return {"message": message, "path": path, "status": status}
@@ -873,24 +2591,323 @@ def filter_lang_local_name(data: dict, lang: str) -> dict:
     :result: dict
         a new nested dict with localOtherName filtered per subdivision.
     """
-    entry_re = re.compile(
-        r"'[^']*\(\s*" + re.escape(lang.strip()) + r"\s*\)'"
-        r"|"
-        r"[^,]*\(\s*" + re.escape(lang.strip()) + r"\s*\)",
-        re.IGNORECASE
-    )
+    lang = lang.strip().lower()
     result = {}
     for country_code, subdivisions in data.items():
         result[country_code] = {}
         for subdiv_code, subdiv_data in subdivisions.items():
-            new_data = dict(subdiv_data)
-            local = new_data.get('localOtherName')
+            local = subdiv_data.get('localOtherName')
             if local:
-                matches = entry_re.findall(local)
-                new_data['localOtherName'] = ', '.join(m.strip().strip("'") for m in matches) if matches else None
-            result[country_code][subdiv_code] = new_data
+                subdiv_data = dict(subdiv_data, localOtherName=get_local_names(local).get(lang))
+            result[country_code][subdiv_code] = subdiv_data
     return result
 
+def parse_local_other_name(local_other_name: str) -> dict:
+    """
+    Parse a localOtherName attribute into the comma separated names per language tag, for each 
+    tag that is a valid lang query string parameter value. Entries are in the form "Name (langcode)" 
+    or "'Name with, comma (langcode)'" for names that contain commas.
+
+    Parameters
+    ==========
+    :local_other_name: str
+        localOtherName attribute of a subdivision.
+
+    Returns
+    =======
+    :local_names: dict
+        object of lowercase ISO 639 language code to the subdivision's names in that language.
+    """
+    local_names = {}
+    for tag in re.findall(r"\(([^()]*)\)", local_other_name):
+        lang = tag.strip().lower()
+        if lang in local_names or not re.fullmatch(r'[a-z0-9]{2,10}', lang):
+            continue
+        entry_re = re.compile(
+            r"'[^']*\(\s*" + re.escape(lang) + r"\s*\)'"
+            r"|"
+            r"[^,]*\(\s*" + re.escape(lang) + r"\s*\)",
+            re.IGNORECASE
+        )
+        local_names[lang] = ', '.join(m.strip().strip("'") for m in entry_re.findall(local_other_name))
+    return local_names
+
+def dumps_json(data: dict) -> bytes:
+    """ Serialize object into the same compact JSON bytes output by jsonify. """
+    return app.json.dumps_bytes(data) + b"\n"
+
+def make_fragments_response(alpha2_codes: list[str], attributes: tuple[str]|None=None, nested: bool=True) -> Response:
+    """
+    Return a JSON Flask Response built by joining the cached per-country JSON fragments, 
+    rather than encoding the subdivision data on each request. The output is identical
+    to that of jsonify.
+
+    Parameters
+    ==========
+    :alpha2_codes: list
+        alpha-2 codes of the countries to include in the response.
+    :attributes: tuple/None (default=None)
+        parsed tuple of attributes to keep from parse_filter_attributes.
+    :nested: bool (default=True)
+        return the nested {country_code: {subdiv_code: data}} object, else the flat 
+        {subdiv_code: data} object of the first country.
+
+    Returns
+    =======
+    :flask.Response
+        JSON response.
+    """
+    if wants_msgpack():
+        if not nested:
+            return Response(get_country_msgpack(alpha2_codes[0], attributes), status=200, mimetype=MSGPACK_MIMETYPE)
+        return Response(b"".join(iter_country_msgpack(alpha2_codes, attributes)), status=200, mimetype=MSGPACK_MIMETYPE)
+
+    if not nested:
+        return Response(get_country_fragment(alpha2_codes[0], attributes) + b"\n", status=200, mimetype='application/json')
+
+    body = b",".join(iter_country_json(alpha2_codes, attributes))
+    return Response(b"{" + body + b"}\n", status=200, mimetype='application/json')
+
+def iter_country_json(alpha2_codes: list[str], attributes: tuple[str]|None=None, lang: str|None=None):
+    """
+    Generator that yields the '"country_code":{...}' JSON member of each country, in the order 
+    jsonify would output them, using the cached per-country JSON fragments if no language 
+    filtering of the localOtherName attribute is required.
+
+    Parameters
+    ==========
+    :alpha2_codes: list
+        alpha-2 codes of the countries to include.
+    :attributes: tuple/None (default=None)
+        parsed tuple of attributes to keep from parse_filter_attributes.
+    :lang: str/None (default=None)
+        ISO 639 language code to filter the localOtherName attribute by.
+
+    Yields
+    ======
+    :country_json: bytes
+        JSON object member of each country's subdivision data.
+    """
+    #remove any duplicate codes, ordering the countries as jsonify would
+    alpha2_codes = list(dict.fromkeys(alpha2_codes))
+    if app.json.sort_keys:
+        alpha2_codes = sorted(alpha2_codes)
+
+    for code in alpha2_codes:
+        if lang:
+            country_json = app.json.dumps_bytes(filter_lang_local_name({code: get_country_projection(code, attributes)}, lang)[code])
+        else:
+            country_json = get_country_fragment(code, attributes)
+        yield app.json.dumps_bytes(code) + b":" + country_json
+
+def iter_country_msgpack(alpha2_codes: list[str], attributes: tuple[str]|None=None, lang: str|None=None):
+    """
+    Generator that yields the MessagePack map header of the nested {country_code: {subdiv_code: data}} 
+    object followed by each country's key and value, in the same order as iter_country_json, using 
+    the cached per-country MessagePack fragments if no language filtering is required.
+
+    Parameters
+    ==========
+    :alpha2_codes: list
+        alpha-2 codes of the countries to include.
+    :attributes: tuple/None (default=None)
+        parsed tuple of attributes to keep from parse_filter_attributes.
+    :lang: str/None (default=None)
+        ISO 639 language code to filter the localOtherName attribute by.
+
+    Yields
+    ======
+    :country_msgpack: bytes
+        MessagePack map header, then the key and value of each country's subdivision data.
+    """
+    alpha2_codes = list(dict.fromkeys(alpha2_codes))
+    if app.json.sort_keys:
+        alpha2_codes = sorted(alpha2_codes)
+
+    yield msgpack.Packer().pack_map_header(len(alpha2_codes))
+    for code in alpha2_codes:
+        if lang:
+            country_msgpack = dumps_msgpack(filter_lang_local_name({code: get_country_projection(code, attributes)}, lang)[code])
+        else:
+            country_msgpack = get_country_msgpack(code, attributes)
+        yield dumps_msgpack(code) + country_msgpack
+
+def make_streaming_response(alpha2_codes: list[str], attributes: tuple[str]|None=None, lang: str|None=None) -> Response:
+    """
+    Return a chunked JSON Flask Response of the nested {country_code: {subdiv_code: data}} object, 
+    streamed one country at a time from a generator so the full response is never held in memory. 
+    The streamed output is identical to that of jsonify.
+
+    Parameters
+    ==========
+    :alpha2_codes: list
+        alpha-2 codes of the countries to include in the response.
+    :attributes: tuple/None (default=None)
+        parsed tuple of attributes to keep from parse_filter_attributes.
+    :lang: str/None (default=None)
+        ISO 639 language code to filter the localOtherName attribute by.
+
+    Returns
+    =======
+    :flask.Response
+        streamed JSON response.
+    """
+    if wants_msgpack():
+        return Response(iter_country_msgpack(alpha2_codes, attributes, lang), status=200, mimetype=MSGPACK_MIMETYPE)
+
+    def generate():
+        separator = b"{"
+        for country_json in iter_country_json(alpha2_codes, attributes, lang):
+            yield separator + country_json
+            separator = b","
+        yield (b"{}" if separator == b"{" else b"}") + b"\n"
+
+    return Response(generate(), status=200, mimetype='application/json')
+
+def iter_ndjson_records(country_items):
+    """ Generator that yields one flat JSON record per subdivision, per line, from the (country_code, {subdiv_code: data}) pairs. """
+    for country_code, subdivisions in country_items:
+        for subdiv_code, subdiv_data in subdivisions.items():
+            record = {"countryCode": country_code, "subdivisionCode": subdiv_code, **subdiv_data}
+            yield app.json.dumps_bytes(record, sort_keys=False) + b"\n"
+
+def make_ndjson_response(alpha2_codes: list[str], attributes: tuple[str]|None=None, lang: str|None=None) -> Response:
+    """
+    Return a streamed NDJSON Flask Response of the countries' subdivision data, reading each 
+    country's cached projection as it's streamed, and filtering its localOtherName attribute if 
+    applicable, so the data of every country is never copied into memory at once.
+
+    Parameters
+    ==========
+    :alpha2_codes: list
+        alpha-2 codes of the countries to include in the response.
+    :attributes: tuple/None (default=None)
+        parsed tuple of attributes to keep from parse_filter_attributes.
+    :lang: str/None (default=None)
+        ISO 639 language code to filter the localOtherName attribute by.
+
+    Returns
+    =======
+    :flask.Response
+        streamed NDJSON response.
+    """
+    def iter_countries():
+        for code in dict.fromkeys(alpha2_codes):
+            country_data = get_country_projection(code, attributes)
+            if lang:
+                country_data = filter_lang_local_name({code: country_data}, lang)[code]
+            yield code, country_data
+
+    return Response(iter_ndjson_records(iter_countries()), status=200, mimetype='application/x-ndjson')
+
+def encode_cursor(offset: int) -> str:
+    """ Encode the offset into the flat subdivision index as an opaque cursor, tied to the current dataset. """
+    return base64.urlsafe_b64encode(f"{get_dataset_hash()[:12]}:{offset}".encode("utf-8")).decode("utf-8").rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """ 
+    Decode an opaque cursor into its offset into the flat subdivision index. An empty cursor is 
+    the first page. Returns -1 if the cursor is invalid or was issued for a different dataset. 
+    """
+    cursor = cursor.strip().rstrip('/')
+    if (cursor == ""):
+        return 0
+    try:
+        dataset_hash, offset = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8").split(":")
+        offset = int(offset)
+    except ValueError:
+        return -1
+    if dataset_hash != get_dataset_hash()[:12] or not (0 <= offset <= len(get_subdivision_index()["entries"])):
+        return -1
+    return offset
+
+def make_cursor_page_response(offset: int, page_size: int, total_countries: int, attributes: tuple[str]|None=None, lang: str|None=None) -> tuple[Response, int]:
+    """
+    Return a page of /api/all data of up to page_size subdivisions starting at the offset into 
+    the flat subdivision index, alongside the opaque cursor of the next page. Only the page's 
+    subdivisions are read, so each page costs O(page_size). Countries without subdivisions 
+    aren't included in cursor pages.
+
+    Parameters
+    ==========
+    :offset: int
+        offset into the flat subdivision index decoded from the cursor.
+    :page_size: int
+        maximum number of subdivisions in the page.
+    :total_countries: int
+        number of countries, in dataset order, to paginate over, from the limit query string parameter.
+    :attributes: tuple/None (default=None)
+        parsed tuple of attributes to keep from parse_filter_attributes.
+    :lang: str/None (default=None)
+        ISO 639 language code to filter the localOtherName attribute by.
+
+    Returns
+    =======
+    :flask.Response
+        JSON response of the page's nested {country_code: {subdiv_code: data}} object and 
+        next page cursor, None if it's the last page.
+    :status_code: int
+        response status code.
+    """
+    subdivision_index = get_subdivision_index()
+    end = subdivision_index["countryOffsets"][total_countries]
+    next_offset = min(offset + page_size, end)
+
+    page_data = {}
+    for country_code, subdiv_code in subdivision_index["entries"][offset:next_offset]:
+        page_data.setdefault(country_code, {})[subdiv_code] = get_country_projection(country_code, attributes)[subdiv_code]
+
+    #filter localOtherName to the requested language, if applicable
+    if lang:
+        page_data = filter_lang_local_name(page_data, lang)
+
+    return jsonify_data({
+        "data": page_data,
+        "pageSize": page_size,
+        "nextCursor": encode_cursor(next_offset) if next_offset < end else None,
+        "totalSubdivisions": end
+    }), 200
+
+def make_precompressed_response(cache: dict) -> Response:
+    """
+    Return a Flask Response from the pre-serialized JSON bytes and their compressed variants. 
+    The encoding is chosen via the Accept-Encoding header, preferring brotli then gzip, and a 
+    304 is returned if the client's If-None-Match header matches the content-hash ETag.
+
+    Parameters
+    ==========
+    :cache: dict
+        object of the pre-serialized 'identity', 'gzip' and 'br' JSON bytes and their 'etag'.
+
+    Returns
+    =======
+    :flask.Response
+        JSON response, compressed if accepted by the client, or empty 304 response.
+    """
+    #each encoding is a different representation so gets its own strong ETag
+    etags = {encoding: cache["etag"] + ("" if encoding == "identity" else "-" + encoding) for encoding in ("identity", "gzip", "br")}
+
+    #choose the best encoding the client accepts
+    encoding = "identity"
+    if cache["br"] is not None and request.accept_encodings["br"]:
+        encoding = "br"
+    elif request.accept_encodings["gzip"]:
+        encoding = "gzip"
+
+    response = Response(status=200, mimetype='application/json')
+    response.set_etag(etags[encoding])
+    response.vary.add('Accept-Encoding')
+
+    #return empty 304 if client already has the current version of the response
+    if any(request.if_none_match.contains(etag) for etag in etags.values()):
+        response.status_code = 304
+        return response
+
+    response.set_data(cache[encoding])
+    if encoding != "identity":
+        response.content_encoding = encoding
+    return response
+
 def make_format_response(data: dict, format_param: str) -> Response:
     """
     Convert the standard nested {country: {subdiv: data}} object to the requested
@@ -901,63 +2918,237 @@ def make_format_response(data: dict, format_param: str) -> Response:
     :data: dict
         nested {country_code: {subdiv_code: data}} object.
     :format_param: str
-        one of 'csv' or 'geojson'.
+        one of 'csv', 'geojson', 'ndjson', 'columnar', 'arrow' or 'parquet'.
 
     Returns
     =======
     :flask.Response
-        CSV or GeoJSON response.
+        CSV, GeoJSON, streamed NDJSON, columnar JSON, Arrow or Parquet response.
     """
+    if format_param == 'columnar':
+        return jsonify_data(encode_columnar(data)), 200
+
+    if format_param in arrow_mimetypes:
+        #only the prebuilt file of the full /api/all dataset is available without pyarrow
+        if pyarrow is None:
+            return jsonify(create_error_message(f"The {format_param} format is only available for the full /api/all dataset, without the filter, limit or lang query string parameters.", request.url)), 400
+        return make_arrow_response(serialize_arrow_table(build_arrow_table(data), format_param), format_param)
+
+    if format_param == 'ndjson':
+        return Response(iter_ndjson_records(data.items()), status=200, mimetype='application/x-ndjson')
+
     if format_param == 'geojson':
-        features = []
-        for country_code, subdivisions in data.items():
-            for subdiv_code, subdiv_data in subdivisions.items():
-                latlng = subdiv_data.get('latLng')
-                geometry = None
-                if latlng and len(latlng) == 2:
-                    geometry = {
-                        "type": "Point",
-                        "coordinates": [latlng[1], latlng[0]]  # GeoJSON order: [lng, lat]
-                    }
-                properties = {k: v for k, v in subdiv_data.items() if k != 'latLng'}
-                properties['countryCode'] = country_code
-                properties['subdivisionCode'] = subdiv_code
-                features.append({
-                    "type": "Feature",
-                    "id": subdiv_code,
-                    "geometry": geometry,
-                    "properties": properties
-                })
-        geojson = {"type": "FeatureCollection", "features": features}
-        return Response(json.dumps(geojson), status=200, mimetype='application/geo+json')
+        #stream the FeatureCollection one country's features at a time, keeping memory bounded, serialized via the 
+        # stdlib json module with its default separators and ASCII escaping, as the GeoJSON output has always been
+        def generate():
+            separator = b""
+            yield b'{"type": "FeatureCollection", "features": ['
+            for country_code, subdivisions in data.items():
+                features = []
+                for subdiv_code, subdiv_data in subdivisions.items():
+                    latlng = subdiv_data.get('latLng')
+                    geometry = None
+                    if latlng and len(latlng) == 2:
+                        geometry = {
+                            "type": "Point",
+                            "coordinates": [latlng[1], latlng[0]]  # GeoJSON order: [lng, lat]
+                        }
+                    properties = {k: v for k, v in subdiv_data.items() if k != 'latLng'}
+                    properties['countryCode'] = country_code
+                    properties['subdivisionCode'] = subdiv_code
+                    features.append(json.dumps({
+                        "type": "Feature",
+                        "id": subdiv_code,
+                        "geometry": geometry,
+                        "properties": properties
+                    }).encode("utf-8"))
+                if features:
+                    yield separator + b", ".join(features)
+                    separator = b", "
+            yield b"]}"
+        return Response(generate(), status=200, mimetype='application/geo+json')
 
     if format_param == 'csv':
         fieldnames = ['subdivisionCode', 'countryCode', 'name', 'localOtherName',
                       'type', 'parentCode', 'latLng', 'flag', 'history']
-        output = io.StringIO()
-        writer = csv.DictWriter(output, fieldnames=fieldnames, extrasaction='ignore')
-        writer.writeheader()
-        for country_code, subdivisions in data.items():
-            for subdiv_code, subdiv_data in subdivisions.items():
-                row = {
-                    'subdivisionCode': subdiv_code,
-                    'countryCode': country_code,
-                    'name': subdiv_data.get('name') or '',
-                    'localOtherName': subdiv_data.get('localOtherName') or '',
-                    'type': subdiv_data.get('type') or '',
-                    'parentCode': subdiv_data.get('parentCode') or '',
-                    'latLng': str(subdiv_data.get('latLng')) if subdiv_data.get('latLng') else '',
-                    'flag': subdiv_data.get('flag') or '',
-                    'history': json.dumps(subdiv_data.get('history')) if subdiv_data.get('history') else ''
-                }
-                writer.writerow(row)
+
+        #stream the CSV one country's rows at a time, the writer returning each formatted row rather than buffering it
+        def generate():
+            writer = csv.DictWriter(CSVRowEcho(), fieldnames=fieldnames, extrasaction='ignore')
+            yield writer.writeheader().encode("utf-8")
+            for country_code, subdivisions in data.items():
+                rows = []
+                for subdiv_code, subdiv_data in subdivisions.items():
+                    row = {
+                        'subdivisionCode': subdiv_code,
+                        'countryCode': country_code,
+                        'name': subdiv_data.get('name') or '',
+                        'localOtherName': subdiv_data.get('localOtherName') or '',
+                        'type': subdiv_data.get('type') or '',
+                        'parentCode': subdiv_data.get('parentCode') or '',
+                        'latLng': str(subdiv_data.get('latLng')) if subdiv_data.get('latLng') else '',
+                        'flag': subdiv_data.get('flag') or '',
+                        'history': json.dumps(subdiv_data.get('history')) if subdiv_data.get('history') else ''
+                    }
+                    rows.append(writer.writerow(row))
+                if rows:
+                    yield "".join(rows).encode("utf-8")
         return Response(
-            output.getvalue(),
+            generate(),
             status=200,
             mimetype='text/csv',
             headers={'Content-Disposition': 'attachment; filename="iso3166-2.csv"'}
         )
 
+def encode_columnar(data: dict) -> dict:
+    """
+    Encode the standard nested {country: {subdiv: data}} object into the compact columnar JSON 
+    encoding: a header row of column names followed by one row array per subdivision. The 
+    repeated type values are dictionary-encoded as indexes into the list of distinct types and 
+    flag URLs are stored relative to their common base URL.
+
+    Parameters
+    ==========
+    :data: dict
+        nested {country_code: {subdiv_code: data}} object.
+
+    Returns
+    =======
+    :columnar: dict
+        object of the columns, rows, type dictionary and flag base URL.
+    """
+    #get the attributes present in the data, in the standard attribute order
+    present = set()
+    for subdivisions in data.values():
+        for subdiv_data in subdivisions.values():
+            present.update(subdiv_data)
+    attributes = [attr for attr in all_attributes if attr in present] + sorted(present - set(all_attributes))
+
+    #get the base URL shared by all the subdivision flags, up to its last path separator
+    flags = [subdiv_data['flag'] for subdivisions in data.values() for subdiv_data in subdivisions.values() if subdiv_data.get('flag')]
+    flag_base_url = os.path.commonprefix(flags) if flags else ""
+    flag_base_url = flag_base_url[:flag_base_url.rfind('/') + 1]
+
+    types = {}
+    rows = []
+    for country_code, subdivisions in data.items():
+        for subdiv_code, subdiv_data in subdivisions.items():
+            row = [country_code, subdiv_code]
+            for attr in attributes:
+                value = subdiv_data.get(attr)
+                if attr == 'type' and value is not None:
+                    value = types.setdefault(value, len(types))
+                elif attr == 'flag' and value:
+                    value = value[len(flag_base_url):]
+                row.append(value)
+            rows.append(row)
+
+    return {
+        "columns": ["countryCode", "subdivisionCode"] + attributes,
+        "dictionaries": {"type": list(types)},
+        "flagBaseUrl": flag_base_url,
+        "rows": rows
+    }
+
+def build_arrow_table(data: dict) -> "pyarrow.Table":
+    """
+    Convert the standard nested {country: {subdiv: data}} object into a typed Apache Arrow table 
+    with one row per subdivision. The latLng attribute is split into float lat and lng columns, 
+    history is a list of structs and the country code and type columns are dictionary-encoded. 
+    Only the attributes present in the data are included.
+
+    Parameters
+    ==========
+    :data: dict
+        nested {country_code: {subdiv_code: data}} object.
+
+    Returns
+    =======
+    :table: pyarrow.Table
+        typed table of the subdivision data.
+    """
+    history_type = pyarrow.list_(pyarrow.struct([(key, pyarrow.string()) for key in ("Change", "Date Issued", "Description of Change", "Source")]))
+
+    #get the attributes present in the data, in the standard attribute order
+    present = set()
+    for subdivisions in data.values():
+        for subdiv_data in subdivisions.values():
+            present.update(subdiv_data)
+
+    rows = [(country_code, subdiv_code, subdiv_data) for country_code, subdivisions in data.items() for subdiv_code, subdiv_data in subdivisions.items()]
+    columns = {
+        "countryCode": pyarrow.array([row[0] for row in rows], pyarrow.string()).dictionary_encode(),
+        "subdivisionCode": pyarrow.array([row[1] for row in rows], pyarrow.string())
+    }
+    for attr in all_attributes:
+        if attr not in present:
+            continue
+        values = [row[2].get(attr) for row in rows]
+        if attr == 'latLng':
+            columns["lat"] = pyarrow.array([float(latlng[0]) if latlng else None for latlng in values], pyarrow.float64())
+            columns["lng"] = pyarrow.array([float(latlng[1]) if latlng else None for latlng in values], pyarrow.float64())
+        elif attr == 'history':
+            columns[attr] = pyarrow.array(values, history_type)
+        elif attr == 'type':
+            columns[attr] = pyarrow.array(values, pyarrow.string()).dictionary_encode()
+        else:
+            columns[attr] = pyarrow.array(values, pyarrow.string())
+    return pyarrow.table(columns)
+
+def serialize_arrow_table(table: "pyarrow.Table", format_param: str) -> bytes:
+    """ Serialize the Arrow table into the bytes of an Arrow IPC file or a zstd compressed Parquet file. """
+    sink = pyarrow.BufferOutputStream()
+    if format_param == 'parquet':
+        pyarrow.parquet.write_table(table, sink, compression="zstd")
+    else:
+        with pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def make_arrow_response(body: bytes, format_param: str) -> Response:
+    """ Return a downloadable Flask Response of the Arrow IPC or Parquet file bytes. """
+    return Response(
+        body,
+        status=200,
+        mimetype=arrow_mimetypes[format_param],
+        headers={'Content-Disposition': f'attachment; filename="iso3166-2.{format_param}"'}
+    )
+
+class CSVRowEcho:
+    """ File-like object for csv writers that returns each formatted row from write() instead of storing it. """
+    def write(self, value: str) -> str:
+        return value
+
+def clear_caches() -> None:
+    """ Clear the Subdivisions class instance and all cached subdivision data, indexes and responses. """
+    get_subdivision_instance.cache_clear()
+    get_snapshot.cache_clear()
+    get_shard_manifest.cache_clear()
+    get_country_shard.cache_clear()
+    get_all_subdivisions.cache_clear()
+    get_all_response_cache.cache_clear()
+    get_arrow_file.cache_clear()
+    get_country_hashes.cache_clear()
+    get_country_hash.cache_clear()
+    get_dataset_hash.cache_clear()
+    get_hash_history.cache_clear()
+    get_country_fragment.cache_clear()
+    get_country_msgpack.cache_clear()
+    get_country_projection.cache_clear()
+    projection_response_cache.clear()
+    response_cache.clear()
+    search_cache.clear()
+    get_local_names.cache_clear()
+    get_search_index.cache_clear()
+    get_search_bktree.cache_clear()
+    get_country_name_index.cache_clear()
+    resolve_country_name.cache_clear()
+    get_autocomplete_index.cache_clear()
+    get_language_index.cache_clear()
+    get_subdivision_index.cache_clear()
+    get_all_subdivision_codes.cache_clear()
+    get_alpha2_codes.cache_clear()
+
 @app.route('/clear-cache')
 @app.route('/api/clear-cache')
 def clear_cache():
@@ -965,19 +3156,18 @@ def clear_cache():
     token = request.args.get('token', '')
     if not CACHE_CLEAR_TOKEN or token != CACHE_CLEAR_TOKEN:
         return jsonify(create_error_message("Unauthorized. A valid token query parameter is required.", request.url, 401)), 401
-    get_subdivision_instance.cache_clear()
-    get_all_subdivisions.cache_clear()
-    get_all_subdivision_codes.cache_clear()
+    clear_caches()
     return 'Cache cleared'
 
 @app.route('/version')
 @app.route('/api/version')
 def get_version():
     """ Get the current version of the iso3166-2 being used by the API. Mainly used for dev. """
-    return get_subdivision_instance().__version__
+    return iso3166_2_version
 
 @app.route('/api/stats', methods=['GET'])
 @app.route('/stats', methods=['GET'])
+@conditional_etag
 def api_stats() -> tuple[dict, int]:
     """
     Flask route for '/api/stats' path/endpoint. Return live statistics about the ISO 3166-2
@@ -1011,7 +3201,7 @@ def api_stats() -> tuple[dict, int]:
     )
     flag_pct = round(total_with_flags / total_subdivisions * 100, 1) if total_subdivisions else 0
 
-    return jsonify({
+    return jsonify_data({
         "totalCountries": total_countries,
         "totalSubdivisions": total_subdivisions,
         "countriesWithSubdivisions": countries_with_subdivisions,
@@ -1020,7 +3210,7 @@ def api_stats() -> tuple[dict, int]:
         "maxSubdivisions": {"country": max_country, "count": nonzero.get(max_country, 0)} if max_country else None,
         "minSubdivisions": {"country": min_country, "count": nonzero.get(min_country, 0)} if min_country else None,
         "flagCoverage": {"count": total_with_flags, "percentage": flag_pct},
-        "packageVersion": get_subdivision_instance().__version__
+        "packageVersion": iso3166_2_version
     }), 200
 
 @app.route('/api/subdivision', methods=['POST'])
@@ -1077,7 +3267,7 @@ def api_subdivision_post() -> tuple[dict, int]:
                 f"Subdivision code {subd} not found in list of available subdivisions for {subd.split('-')[0]}.",
                 request.url)), 400
         cc = subd.split('-')[0]
-        iso3166_2.setdefault(cc, {})[subd] = get_all_subdivisions()[cc][subd]
+        iso3166_2.setdefault(cc, {})[subd] = get_country_data(cc)[subd]
 
     filter_param = request.args.get('filter')
     if filter_param is not None:
@@ -1097,7 +3287,7 @@ def api_subdivision_post() -> tuple[dict, int]:
                 request.url)), 400
         iso3166_2 = filter_lang_local_name(iso3166_2, lang_param)
 
-    return jsonify(iso3166_2), 200
+    return jsonify_data(iso3166_2), 200
 
 @app.get("/openapi.yaml")
 @app.get("/spec")
@@ -1209,7 +3399,7 @@ def api_coords() -> tuple[dict, int]:
         
         #search for the subdivision by name within the country
         try:
-            all_country_subdivisions = get_subdivision_instance()[country_code]
+            all_country_subdivisions = get_country_subdivisions(country_code)
             
             #search through subdivisions to find matching name
             found_subdivision = None
@@ -1237,15 +3427,15 @@ def api_coords() -> tuple[dict, int]:
     
     #get the subdivision data
     try:
-        all_iso3166_2 = get_all_subdivisions()
-        
-        if country_code not in all_iso3166_2:
+        try:
+            country_subdivisions = get_country_data(country_code)
+        except KeyError:
             return jsonify(create_error_message(f"Country {country_code} not found in subdivision database.", request.url, 404)), 404
         
-        if iso3166_2_code not in all_iso3166_2[country_code]:
+        if iso3166_2_code not in country_subdivisions:
             return jsonify(create_error_message(f"Subdivision code {iso3166_2_code} not found for country {country_code}.", request.url, 404)), 404
         
-        subdivision_data = all_iso3166_2[country_code][iso3166_2_code]
+        subdivision_data = country_subdivisions[iso3166_2_code]
         
         #structure output in standard format: {country_code: {subdivision_code: data}}
         iso3166_2 = {
@@ -1261,7 +3451,7 @@ def api_coords() -> tuple[dict, int]:
             if (iso3166_2 == -1):
                 return jsonify(create_error_message(f'Invalid attribute name input to filter query string parameter: {filter_param}. Refer to the list of supported attributes: {", ".join(all_attributes)}.', request.url)), 400
         
-        return jsonify(iso3166_2), 200
+        return jsonify_data(iso3166_2), 200
         
     except Exception as e:
         return jsonify(create_error_message(f"Error retrieving subdivision data: {str(e)}", request.url, 500)), 500
@@ -1314,11 +3504,17 @@ def get_random() -> tuple[dict, int]:
         if (iso3166_2 == -1):
             return jsonify(create_error_message(f'Invalid attribute name input to filter query string parameter: {filter_param}. Refer to the list of supported attributes: {", ".join(all_attributes)}.', request.url)), 400
     
-    return jsonify(iso3166_2), 200
+    return jsonify_data(iso3166_2), 200
 
 # def handler(environ, start_response):
 #     return app(environ, start_response)
 
 if __name__ == '__main__':
-    #run Flask app 
-    app.run(debug=True)
\ No newline at end of file
+    #build the binary dataset snapshot, if applicable, else run Flask app
+    if "--build-snapshot" in sys.argv:
+        print(f"Snapshot for iso3166-2 v{iso3166_2_version} exported to {build_snapshot()}.")
+        print(f"Country shards for iso3166-2 v{iso3166_2_version} exported to {build_shards()}.")
+        print(f"Country hashes for iso3166-2 v{iso3166_2_version} exported to {build_hash_history()}.")
+        print(f"Arrow and Parquet files for iso3166-2 v{iso3166_2_version} exported to {build_arrow_files()}.")
+    else:
+        app.run(debug=True)
\ No newline at end of file
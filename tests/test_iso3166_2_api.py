@@ -3,11 +3,24 @@ from iso3166_2 import Subdivisions
 import requests
 import json
 import os
+import csv
+import io
 from fake_useragent import UserAgent
 from jsonschema import validate, ValidationError
 from importlib.metadata import metadata
 from bs4 import BeautifulSoup
 import unittest
+import sys
+import gzip
+import tempfile
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+import msgpack
+from flask import jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import index
+
 unittest.TestLoader.sortTestMethodsUsing = None
 
 # @unittest.skip("")
@@ -1319,14 +1332,19 @@ class ISO3166_2_API_Local_Tests(unittest.TestCase):
     """
     @classmethod
     def setUpClass(cls):
-        """ Import the Flask app and create a shared test client. """
-        import sys
-        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        from index import app
-        app.config['TESTING'] = True
-        cls.client = app.test_client()
+        """ Create a shared test client of the Flask app. """
+        index.app.config['TESTING'] = True
+        cls.client = index.app.test_client()
         cls.correct_subdivision_keys = ["name", "localOtherName", "type", "parentCode", "latLng", "flag", "history"]
 
+    def setUp(self):
+        """ Start each test with empty caches, so cached data and indexes are rebuilt from the current settings. """
+        index.clear_caches()
+
+    def tearDown(self):
+        """ Clear any data cached by the test, including from patched paths and settings. """
+        index.clear_caches()
+
     def test_homepage_local(self):
         """ Test that the homepage returns 200 with HTML content. """
         response = self.client.get('/api')
@@ -1347,6 +1365,23 @@ class ISO3166_2_API_Local_Tests(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         data = json.loads(response.data)
         self.assertEqual(len(data), 5)
+        for invalid_limit, message in [("0", "must be greater than 0."), ("-3", "must be greater than 0."),
+                                       ("abc", "must be an integer."), ("2.5", "must be an integer.")]:
+            response = self.client.get(f'/api/all?limit={invalid_limit}')
+            self.assertEqual(response.status_code, 400, invalid_limit)
+            self.assertEqual(response.json["message"], "Limit query string parameter " + message)
+
+    def test_parse_limit_param_local(self):
+        """ Test the limit query string parameter shared by /api/all, /api/search and /api/autocomplete is parsed and bounded. """
+        self.assertIsNone(index.parse_limit_param(None))
+        self.assertEqual(index.parse_limit_param(None, 10, 100), 10)
+        self.assertEqual(index.parse_limit_param(" 25/", 10, 100), 25)
+        self.assertEqual(index.parse_limit_param("100000"), 100000)
+        for invalid_limit in ["0", "101", "abc", ""]:
+            with self.assertRaises(ValueError, msg=invalid_limit):
+                index.parse_limit_param(invalid_limit, 10, 100)
+        with self.assertRaisesRegex(ValueError, "must be between 1 and 100"):
+            index.parse_limit_param("101", 10, 100)
 
     def test_all_filter_local(self):
         """ Test /api/all with filter query param returns only the requested attributes. """
@@ -1495,6 +1530,11 @@ class ISO3166_2_API_Local_Tests(unittest.TestCase):
         header_row = csv_text.splitlines()[0]
         for col in ["subdivisionCode", "countryCode", "name", "type"]:
             self.assertIn(col, header_row)
+        #history is serialized with the stdlib json defaults, escaping non-ASCII characters
+        country_data = Subdivisions().all["FR"]
+        for row in csv.DictReader(io.StringIO(self.client.get('/api/alpha/FR?format=csv').data.decode('utf-8'))):
+            history = country_data[row["subdivisionCode"]]["history"]
+            self.assertEqual(row["history"], json.dumps(history) if history else "")
 
     def test_format_geojson_local(self):
         """ Test ?format=geojson returns application/geo+json FeatureCollection. """
@@ -1504,6 +1544,8 @@ class ISO3166_2_API_Local_Tests(unittest.TestCase):
         data = json.loads(response.data)
         self.assertEqual(data["type"], "FeatureCollection")
         self.assertIn("features", data)
+        #serialized with the stdlib json defaults, escaping non-ASCII characters
+        self.assertEqual(response.data, json.dumps(data).encode("utf-8"))
 
     def test_format_invalid_local(self):
         """ Test ?format=xml returns 400. """
@@ -1521,4 +1563,575 @@ class ISO3166_2_API_Local_Tests(unittest.TestCase):
 
     def test_lang_invalid_local(self):
         """ Test ?lang=xyz (unsupported code) returns 400. """
-        self.assertEqual(self.client.get('/api/alpha/DE?lang=xyz').status_code, 400)
\ No newline at end of file
+        self.assertEqual(self.client.get('/api/alpha/DE?lang=xyz').status_code, 400)
+
+    def test_lang_multiple_countries_local(self):
+        """ Test ?lang= with multiple countries returns the nested object of every country. """
+        data = json.loads(self.client.get('/api/alpha/FR,DE?lang=deu').data)
+        self.assertEqual(sorted(data), ["DE", "FR"])
+        self.assertEqual(data["DE"], json.loads(self.client.get('/api/alpha/DE?lang=deu').data))
+
+    def test_snapshot_artifact_local(self):
+        """ Test the committed snapshot in data/ is current, else it must be rebuilt via 'python index.py --build-snapshot'. """
+        snapshot = index.get_snapshot()
+        self.assertIsNotNone(snapshot, f"stale or missing snapshot {index.SNAPSHOT_PATH}, rebuild via 'python index.py --build-snapshot'")
+        self.assertEqual(snapshot["all"], Subdivisions().all)
+
+    def test_snapshot_local(self):
+        """ Test the prebuilt binary snapshot loads the same dataset as the Subdivisions class. """
+        all_subdivisions = Subdivisions().all
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+            mock.patch.object(index, "SNAPSHOT_PATH", index.build_snapshot(os.path.join(tmp_dir, "iso3166-2.snapshot"))):
+            snapshot = index.get_snapshot()
+            self.assertIsNotNone(snapshot)
+            self.assertEqual(snapshot["version"], index.iso3166_2_version)
+            self.assertEqual(index.get_all_subdivisions(), all_subdivisions)
+            self.assertIn("DE-BY", index.get_all_subdivision_codes())
+            self.assertIn("DE", index.get_alpha2_codes())
+            response = self.client.get('/api/alpha/DEU')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(json.loads(response.data)), len(all_subdivisions["DE"]))
+
+    def test_shards_artifact_local(self):
+        """ Test the committed country shards in data/ are current, else they must be rebuilt via 'python index.py --build-snapshot'. """
+        manifest = index.get_shard_manifest()
+        self.assertIsNotNone(manifest, f"stale or missing shards {index.SHARD_DIR}, rebuild via 'python index.py --build-snapshot'")
+        all_subdivisions = Subdivisions().all
+        self.assertEqual(manifest["countries"], {country: list(all_subdivisions[country]) for country in all_subdivisions})
+        for country in all_subdivisions:
+            self.assertEqual(index.get_country_shard(country), all_subdivisions[country], country)
+
+    def test_arrow_artifact_local(self):
+        """ Test the committed Arrow and Parquet files in data/ are current, else they must be rebuilt via 'python index.py --build-snapshot'. """
+        for format_param in index.arrow_mimetypes:
+            arrow_path = os.path.join(index.ARROW_DIR, f"iso3166-2-{index.iso3166_2_version}.{format_param}")
+            self.assertTrue(os.path.isfile(arrow_path), f"missing {arrow_path}, rebuild via 'python index.py --build-snapshot'")
+        if index.pyarrow is None:
+            self.skipTest("pyarrow not installed.")
+        import pyarrow
+        import pyarrow.parquet
+        expected = index.build_arrow_table(Subdivisions().all)
+        with open(os.path.join(index.ARROW_DIR, f"iso3166-2-{index.iso3166_2_version}.arrow"), 'rb') as arrow_file:
+            self.assertTrue(pyarrow.ipc.open_file(pyarrow.BufferReader(arrow_file.read())).read_all().equals(expected))
+        self.assertTrue(pyarrow.parquet.read_table(os.path.join(index.ARROW_DIR, f"iso3166-2-{index.iso3166_2_version}.parquet")).equals(expected))
+
+    def test_shards_local(self):
+        """ Test single country endpoints lazily load only the requested country shards. """
+        all_subdivisions = Subdivisions().all
+        with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.object(index, "SHARD_DIR", index.build_shards(tmp_dir)):
+            self.assertIsNotNone(index.get_shard_manifest())
+            self.assertEqual(index.get_shard_manifest()["countries"]["DE"], list(all_subdivisions["DE"]))
+            response = self.client.get('/api/alpha/FR,DEU')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sorted(json.loads(response.data)), ["DE", "FR"])
+            response = self.client.get('/api/subdivision/JM-05')
+            self.assertEqual(json.loads(response.data)['JM']['JM-05']['name'], 'Saint Mary')
+            response = self.client.get('/api/alpha/DE?lang=deu&filter=localOtherName')
+            self.assertEqual(response.status_code, 200)
+            #only the 3 requested country shards are loaded, not the whole dataset
+            self.assertEqual(index.get_country_shard.cache_info().currsize, 3)
+            self.assertEqual(index.get_all_subdivisions.cache_info().currsize, 0)
+            self.assertEqual(self.client.get('/api/subdivision/XX-YY').status_code, 400)
+            #the cursor index is built from the shard manifest
+            subdivision_index = index.get_subdivision_index()
+            self.assertEqual(len(subdivision_index["entries"]), sum(len(codes) for codes in all_subdivisions.values()))
+            self.assertEqual(index.get_all_subdivisions.cache_info().currsize, 0)
+            self.assertEqual(index.get_all_subdivisions()["DE"], all_subdivisions["DE"])
+
+    def test_all_precompressed_local(self):
+        """ Test /api/all with no params is served pre-serialized, compressed and with a strong ETag. """
+        response = self.client.get('/api/all')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers.get('ETag')
+        self.assertIsNotNone(etag)
+        self.assertFalse(etag.startswith('W/'))
+        self.assertIn('Accept-Encoding', response.headers.get('Vary', ''))
+        response_gzip = self.client.get('/api/all', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response_gzip.headers.get('Content-Encoding'), 'gzip')
+        self.assertEqual(gzip.decompress(response_gzip.data), response.data)
+        self.assertLess(len(response_gzip.data), len(response.data))
+        response_not_modified = self.client.get('/api/all', headers={'If-None-Match': etag})
+        self.assertEqual(response_not_modified.status_code, 304)
+        self.assertEqual(response_not_modified.data, b'')
+        #brotli is preferred over gzip when accepted
+        if index.brotli is None:
+            self.skipTest("brotli not installed.")
+        response_brotli = self.client.get('/api/all', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response_brotli.headers.get('Content-Encoding'), 'br')
+        self.assertEqual(index.brotli.decompress(response_brotli.data), response.data)
+        self.assertLess(len(response_brotli.data), len(response_gzip.data))
+        self.assertNotEqual(response_brotli.headers.get('ETag'), response_gzip.headers.get('ETag'))
+
+    def test_country_fragments_local(self):
+        """ Test multi-country responses joined from cached per-country JSON fragments match jsonify. """
+        response = self.client.get('/api/alpha/FR,DE,HU?filter=name,type')
+        self.assertEqual(response.status_code, 200)
+        with index.app.app_context():
+            expected = {code: index.filter_dict(index.get_all_subdivisions()[code], {"name", "type"}) for code in ["FR", "DE", "HU"]}
+            self.assertEqual(response.data, jsonify(expected).get_data())
+            self.assertEqual(self.client.get('/api/all?limit=3').data, jsonify(dict(list(index.get_all_subdivisions().items())[:3])).get_data())
+        self.assertGreaterEqual(index.get_country_fragment.cache_info().currsize, 3)
+        response = self.client.get('/api/country_name/France,Germany?filter=type,name')
+        self.assertEqual(sorted(json.loads(response.data)), ["DE", "FR"])
+        self.assertGreater(index.get_country_fragment.cache_info().hits, 0)
+
+    def test_json_provider_local(self):
+        """ Test the orjson and stdlib JSON providers output the same JSON structure. """
+        if index.orjson is None:
+            self.skipTest("orjson is not installed.")
+        responses = {}
+        for provider in (index.StdlibJSONProvider(index.app), index.OrjsonProvider(index.app)):
+            with mock.patch.object(index.app, "json", provider):
+                index.clear_caches()
+                responses[type(provider).__name__] = [self.client.get(url) for url in
+                    ['/api/alpha/FR,DE', '/api/subdivision/JM-05', '/api/alpha/FR?format=geojson', '/api/country_name/France?format=csv']]
+        stdlib_responses, orjson_responses = responses["StdlibJSONProvider"], responses["OrjsonProvider"]
+        for stdlib_response, orjson_response in zip(stdlib_responses[:3], orjson_responses[:3]):
+            self.assertEqual(stdlib_response.content_type, orjson_response.content_type)
+            self.assertEqual(json.loads(stdlib_response.data), json.loads(orjson_response.data))
+        self.assertEqual(list(json.loads(orjson_responses[2].data)), ["type", "features"])
+        self.assertEqual(len(stdlib_responses[3].data.splitlines()), len(orjson_responses[3].data.splitlines()))
+
+    def test_etag_conditional_get_local(self):
+        """ Test data endpoints return a strong ETag from the normalized request and 304 on If-None-Match. """
+        response = self.client.get('/api/alpha/fr,DE?filter=name')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers.get('ETag')
+        self.assertIsNotNone(etag)
+        self.assertFalse(etag.startswith('W/'))
+        self.assertEqual(self.client.get('/api/alpha/DE, FR?filter=name').headers.get('ETag'), etag)
+        self.assertNotEqual(self.client.get('/api/alpha/FR,DE?filter=type').headers.get('ETag'), etag)
+        self.assertEqual(self.client.get('/api/alpha/DE,FR?filter=type, name').headers.get('ETag'), self.client.get('/api/alpha/FR,DE?filter=name,type').headers.get('ETag'))
+        response_not_modified = self.client.get('/api/alpha/DE,FR?filter=name', headers={'If-None-Match': etag})
+        self.assertEqual(response_not_modified.status_code, 304)
+        self.assertEqual(response_not_modified.data, b'')
+        self.assertEqual(response_not_modified.headers.get('ETag'), etag)
+        for url in ['/api/subdivision/JM-05', '/api/country_name/Australia', '/api/list_subdivisions/DE', '/api/stats', '/api/all?limit=2']:
+            response = self.client.get(url)
+            self.assertIsNotNone(response.headers.get('ETag'), f"Expected ETag header from {url}.")
+            self.assertEqual(self.client.get(url, headers={'If-None-Match': response.headers['ETag']}).status_code, 304)
+        self.assertIsNone(self.client.get('/api/alpha/ZZZ').headers.get('ETag'))
+        #single country ETags only change with the content hash of the requested countries
+        get_country_hash = index.get_country_hash
+        etags = {url: self.client.get(url).headers.get('ETag') for url in ['/api/alpha/DE', '/api/alpha/FR', '/api/subdivision/FR-75C']}
+        with mock.patch.object(index, "get_country_hash", side_effect=lambda alpha2: "changed" if alpha2 == "FR" else get_country_hash(alpha2)):
+            self.assertEqual(index.get_request_content_hash({"input_alpha": "DEU"}), index.get_request_content_hash({"input_alpha": "de"}))
+            self.assertEqual(self.client.get('/api/alpha/DE').headers.get('ETag'), etags['/api/alpha/DE'])
+            self.assertNotEqual(self.client.get('/api/alpha/FR').headers.get('ETag'), etags['/api/alpha/FR'])
+            self.assertNotEqual(self.client.get('/api/subdivision/FR-75C').headers.get('ETag'), etags['/api/subdivision/FR-75C'])
+
+    def test_all_streaming_local(self):
+        """ Test unpaginated JSON /api/all responses are streamed with the same output as non-streamed responses. """
+        response = self.client.get('/api/all?filter=name,type&limit=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.headers.get('Content-Length'))
+        self.assertEqual(response.data, self.client.get('/api/all?filter=name,type&limit=10&stream=0').data)
+        response_lang = self.client.get('/api/all?lang=fra&stream=1')
+        self.assertIsNone(response_lang.headers.get('Content-Length'))
+        data = json.loads(response_lang.data)
+        self.assertGreater(len(data), 200)
+        self.assertEqual(data["FR"]["FR-75C"]["localOtherName"], "Paname (fra)")
+        self.assertEqual(json.loads(self.client.get('/api/all?stream=1').data), json.loads(self.client.get('/api/all').data))
+
+    def test_format_ndjson_local(self):
+        """ Test ?format=ndjson streams one flat JSON record per subdivision. """
+        response = self.client.get('/api/alpha/FR,DE?format=ndjson&filter=name')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('application/x-ndjson', response.content_type)
+        records = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        self.assertEqual(len(records), len(json.loads(self.client.get('/api/alpha/FR').data)) + 16)
+        for record in records:
+            self.assertEqual(sorted(record.keys()), ["countryCode", "name", "subdivisionCode"])
+            self.assertTrue(record["subdivisionCode"].startswith(record["countryCode"] + "-"))
+        for url in ['/api/all?format=ndjson&limit=2', '/api/subdivision/JM-05?format=ndjson', '/api/search/Bavaria?format=ndjson',
+                    '/api/country_name/Germany?format=ndjson']:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, f"Expected 200 from {url}.")
+            self.assertGreater(len(response.data.splitlines()), 0)
+        self.assertEqual(json.loads(self.client.get('/api/subdivision/JM-05?format=ndjson').data)["name"], "Saint Mary")
+        #language filtered records are streamed per country, matching the JSON output
+        response = self.client.get('/api/alpha/FR,DE?format=ndjson&lang=deu', buffered=False)
+        self.assertTrue(response.is_streamed)
+        lang_data = {**json.loads(self.client.get('/api/alpha/FR?lang=deu').data), **json.loads(self.client.get('/api/alpha/DE?lang=deu').data)}
+        for record in map(json.loads, response.get_data().decode('utf-8').splitlines()):
+            self.assertEqual(record["localOtherName"], lang_data[record["subdivisionCode"]]["localOtherName"])
+
+    def test_format_streaming_local(self):
+        """ Test ?format=csv and ?format=geojson are streamed with the same structure as the buffered output. """
+        for format_param in ['csv', 'geojson']:
+            response = self.client.get(f'/api/all?format={format_param}')
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_streamed, f"Expected streamed response for {format_param} format.")
+        csv_rows = list(csv.DictReader(io.StringIO(self.client.get('/api/all?format=csv').data.decode('utf-8'))))
+        self.assertEqual(len(csv_rows), sum(len(subdivisions) for subdivisions in self.client.get('/api/all').json.values()))
+        geojson = json.loads(self.client.get('/api/all?format=geojson').data)
+        self.assertEqual(geojson["type"], "FeatureCollection")
+        self.assertEqual(len(geojson["features"]), len(csv_rows))
+        self.assertEqual([feature["id"] for feature in geojson["features"]], [row["subdivisionCode"] for row in csv_rows])
+        self.assertEqual(list(csv_rows[0].keys()), ['subdivisionCode', 'countryCode', 'name', 'localOtherName',
+                                                   'type', 'parentCode', 'latLng', 'flag', 'history'])
+        empty = json.loads(self.client.get('/api/alpha/AQ?format=geojson').data)
+        self.assertEqual(empty, {"type": "FeatureCollection", "features": []})
+
+    def test_projection_cache_local(self):
+        """ Test filtered /api/all responses are built once per attribute set and served from the projection cache. """
+        expected = {code: {subd: {attr: data[attr] for attr in ("latLng", "name")} for subd, data in subdivisions.items()}
+                    for code, subdivisions in json.loads(self.client.get('/api/all?stream=0').data).items()}
+        response = self.client.get('/api/all?filter=name,latLng')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data), expected)
+        self.assertEqual(self.client.get('/api/all?filter=latLng,name').data, response.data)
+        self.assertEqual((index.projection_response_cache.hits, index.projection_response_cache.misses), (1, 1))
+        self.assertEqual(len(index.projection_response_cache), 1)
+        self.assertEqual(json.loads(self.client.get('/api/all?filter=name,latLng&format=ndjson&limit=1').data.splitlines()[0]).keys(),
+                         {"countryCode", "subdivisionCode", "name", "latLng"})
+        #entries are evicted once the memory cap is exceeded
+        cache = index.ByteSizeLRUCache(10)
+        cache.set("a", b"aaaaa", 5)
+        cache.set("b", b"bbbbb", 5)
+        cache.get("a")
+        cache.set("c", b"ccccc", 5)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (b"aaaaa", None, b"ccccc"))
+        self.assertEqual(cache.current_bytes, 10)
+
+    def test_languages_local(self):
+        """ Test /api/languages endpoint and the indexed localOtherName language filtering. """
+        response = self.client.get('/api/languages')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json), len(Subdivisions().all))
+        self.assertEqual(response.json["AQ"], [])
+        self.assertIn("fra", response.json["CA"])
+        self.assertEqual(response.json["CA"], sorted(response.json["CA"]))
+        response = self.client.get('/api/languages/BEL,CA')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json), ["BE", "CA"])
+        self.assertEqual(self.client.get('/api/languages/XYZ').status_code, 400)
+        #each language's subdivisions are exactly those with a localOtherName left after filtering by it
+        lang_data = self.client.get('/api/alpha/CA?lang=fra').json
+        fra_subdivisions = [code for code, data in lang_data.items() if data["localOtherName"]]
+        self.assertEqual(fra_subdivisions, index.get_language_index()["fra"]["CA"])
+        self.assertEqual(lang_data["CA-QC"]["localOtherName"], "Québec (fra)")
+        self.assertIsNone(self.client.get('/api/alpha/CA?lang=deu').json["CA-QC"]["localOtherName"])
+
+    def test_response_cache_local(self):
+        """ Test data endpoint responses are cached by their normalized endpoint and parameters. """
+        first = self.client.get('/api/alpha/FR,DE?filter=name,type')
+        self.assertEqual(first.headers["X-Cache"], "MISS")
+        second = self.client.get('/alpha/de,FR?filter=type,name')
+        self.assertEqual(second.headers["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.client.get('/api/search/Paris?likeness=090').headers["X-Cache"], "MISS")
+        self.assertEqual(self.client.get('/api/search/Paris?likeness=90').headers["X-Cache"], "HIT")
+        self.assertEqual(self.client.get('/api/search_geo/48.8566,2.3522?radius=25').headers["X-Cache"], "MISS")
+        self.assertEqual(self.client.get('/api/search_geo/48.8566,2.3522?radius=25.0').headers["X-Cache"], "HIT")
+        #search terms keep their case, and error responses aren't cached
+        self.assertEqual(self.client.get('/api/search/paris?likeness=90').headers["X-Cache"], "MISS")
+        self.assertEqual(self.client.get('/api/alpha/XYZ').status_code, 400)
+        self.assertEqual(self.client.get('/api/alpha/XYZ').headers["X-Cache"], "MISS")
+        self.assertEqual((index.response_cache.hits, index.response_cache.misses), (3, 6))
+        #cache is invalidated via the clear-cache endpoint
+        with mock.patch.object(index, "CACHE_CLEAR_TOKEN", "test-token"):
+            self.assertEqual(self.client.get('/api/clear-cache?token=test-token').status_code, 200)
+        self.assertEqual(len(index.response_cache), 0)
+        self.assertEqual(self.client.get('/api/alpha/FR,DE?filter=name,type').headers["X-Cache"], "MISS")
+
+    def test_all_cursor_pagination_local(self):
+        """ Test subdivision-level cursor pagination of /api/all. """
+        all_data = json.loads(self.client.get('/api/all?stream=0&filter=name').data)
+        expected = [(country, subd) for country, subdivisions in all_data.items() for subd in subdivisions]
+        pages, cursor = [], ""
+        while cursor is not None:
+            response = self.client.get(f'/api/all?cursor={cursor}&pageSize=250&filter=name')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json["totalSubdivisions"], len(expected))
+            self.assertLessEqual(sum(len(subdivisions) for subdivisions in response.json["data"].values()), 250)
+            pages.append(response.json["data"])
+            cursor = response.json["nextCursor"]
+        self.assertEqual([(country, subd) for page in pages for country, subdivisions in page.items() for subd in subdivisions], expected)
+        self.assertEqual(pages[0]["AD"]["AD-02"], all_data["AD"]["AD-02"])
+        self.assertTrue(all(sum(len(subdivisions) for subdivisions in page.values()) == 250 for page in pages[:-1]))
+        #limit restricts the paginated countries
+        limited = self.client.get('/api/all?cursor=&pageSize=250&limit=1').json
+        self.assertEqual(list(limited["data"]), ["AD"])
+        self.assertIsNone(limited["nextCursor"])
+        self.assertEqual(self.client.get('/api/all?cursor=notacursor').status_code, 400)
+        self.assertEqual(self.client.get('/api/all?cursor=&pageSize=0').status_code, 400)
+
+    def test_encoding_columnar_local(self):
+        """ Test ?encoding=columnar returns the compact columnar encoding of the nested subdivision data. """
+        expected = json.loads(self.client.get('/api/alpha/FR,DE').data)
+        response = self.client.get('/api/alpha/FR,DE?encoding=columnar')
+        self.assertEqual(response.status_code, 200)
+        columnar = response.json
+        self.assertEqual(columnar["columns"], ["countryCode", "subdivisionCode", "name", "localOtherName", "type", "parentCode", "flag", "latLng", "history"])
+        self.assertEqual(columnar["flagBaseUrl"], "https://raw.githubusercontent.com/amckenna41/iso3166-flags/main/iso3166-2-flags/")
+        #decode the rows back into the nested object
+        decoded = {}
+        for row in columnar["rows"]:
+            subdiv_data = dict(zip(columnar["columns"][2:], row[2:]))
+            subdiv_data["type"] = columnar["dictionaries"]["type"][subdiv_data["type"]]
+            if subdiv_data["flag"] is not None:
+                subdiv_data["flag"] = columnar["flagBaseUrl"] + subdiv_data["flag"]
+            decoded.setdefault(row[0], {})[row[1]] = subdiv_data
+        self.assertEqual(decoded, expected)
+        self.assertLess(len(response.data), len(self.client.get('/api/alpha/FR,DE').data))
+        filtered = self.client.get('/api/all?encoding=columnar&filter=name&limit=2').json
+        self.assertEqual(filtered["columns"], ["countryCode", "subdivisionCode", "name"])
+        self.assertEqual(filtered["dictionaries"], {"type": []})
+        for url in ['/api/subdivision/GB-ABD?encoding=columnar', '/api/country_name/Germany?encoding=columnar', '/api/search/Bavaria?encoding=columnar']:
+            self.assertEqual(self.client.get(url).status_code, 200, f"Expected 200 from {url}.")
+        self.assertEqual(self.client.get('/api/alpha/FR?encoding=rows').status_code, 400)
+
+    def test_sync_local(self):
+        """ Test /api/sync returns only the countries whose content hash differs to the client's. """
+        full = self.client.post('/api/sync', json={"hashes": {}})
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(full.json["version"], index.iso3166_2_version)
+        self.assertEqual(len(full.json["changed"]), len(Subdivisions().all))
+        self.assertEqual(full.json["changed"]["FR"], json.loads(self.client.get('/api/alpha/FR').data))
+        hashes = dict(full.json["hashes"])
+        hashes["FR"] = "outdated"
+        hashes["XX"] = "removed"
+        del hashes["DE"]
+        response = self.client.post('/api/sync', json={"hashes": hashes})
+        self.assertEqual(sorted(response.json["changed"]), ["DE", "FR"])
+        self.assertEqual(response.json["hashes"], {"DE": full.json["hashes"]["DE"], "FR": full.json["hashes"]["FR"]})
+        self.assertEqual(response.json["removed"], ["XX"])
+        self.assertEqual(self.client.get(f'/api/sync?since={index.iso3166_2_version}').json["changed"], {})
+        #changes since the previous version from the committed hash history, only the countries changed in 1.8.4
+        since_previous = self.client.get('/api/sync?since=1.8.3')
+        self.assertEqual(since_previous.status_code, 200)
+        self.assertEqual(sorted(since_previous.json["changed"]), ["BY", "CH", "CY", "GB", "KG", "KR", "KZ", "PE", "TL"])
+        self.assertEqual(since_previous.json["changed"]["GB"], json.loads(self.client.get('/api/alpha/GB').data))
+        self.assertEqual(since_previous.json["removed"], [])
+        #changes since a previous version, from the hash history
+        with tempfile.TemporaryDirectory() as tmp_dir, mock.patch.object(index, "HASH_HISTORY_PATH", os.path.join(tmp_dir, "hashes.json")):
+            with open(index.HASH_HISTORY_PATH, 'w', encoding="utf-8") as hashes_file:
+                json.dump({"0.0.1": dict(full.json["hashes"], GB="outdated")}, hashes_file)
+            index.get_hash_history.cache_clear()
+            self.assertEqual(list(self.client.get('/api/sync?since=0.0.1').json["changed"]), ["GB"])
+            self.assertEqual(self.client.get('/api/sync?since=0.0.2').status_code, 400)
+            #the history is read once, however many versions are requested
+            with mock.patch("builtins.open", side_effect=AssertionError("hash history reread")):
+                self.assertEqual(self.client.get('/api/sync?since=../0.0.3').status_code, 400)
+            #building adds the installed version, keeping the previous versions
+            index.build_hash_history(index.HASH_HISTORY_PATH)
+            index.get_hash_history.cache_clear()
+            self.assertEqual(sorted(index.get_hash_history()), ["0.0.1", index.iso3166_2_version])
+        self.assertEqual(self.client.get('/api/sync').status_code, 400)
+        self.assertEqual(self.client.post('/api/sync', json={"hashes": ["FR"]}).status_code, 400)
+        self.assertEqual(self.client.post('/api/sync', json={"hashes": {"FR": 1}}).status_code, 400)
+
+    def test_format_arrow_parquet_local(self):
+        """ Test ?format=arrow and ?format=parquet return typed columnar files, the full dataset from the prebuilt files without pyarrow. """
+        for format_param, magic in [("arrow", b"ARROW1"), ("parquet", b"PAR1")]:
+            with open(os.path.join(index.ARROW_DIR, f"iso3166-2-{index.iso3166_2_version}.{format_param}"), 'rb') as arrow_file:
+                prebuilt = arrow_file.read()
+            with mock.patch.object(index, "pyarrow", None):
+                response = self.client.get(f'/api/all?format={format_param}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data, prebuilt)
+                self.assertTrue(response.data.startswith(magic))
+                self.assertEqual(self.client.get(f'/api/alpha/FR?format={format_param}').status_code, 400)
+                self.assertEqual(self.client.get(f'/api/all?format={format_param}&limit=2').status_code, 400)
+        if index.pyarrow is None:
+            self.skipTest("pyarrow not installed.")
+        import pyarrow
+        import pyarrow.parquet
+        response = self.client.get('/api/all?format=parquet')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, "application/vnd.apache.parquet")
+        table = pyarrow.parquet.read_table(io.BytesIO(response.data))
+        self.assertEqual(table.num_rows, sum(len(subdivisions) for subdivisions in self.client.get('/api/all').json.values()))
+        self.assertEqual(table.schema.field("lat").type, pyarrow.float64())
+        self.assertTrue(pyarrow.types.is_list(table.schema.field("history").type))
+        self.assertTrue(pyarrow.types.is_dictionary(table.schema.field("type").type))
+        response = self.client.get('/api/alpha/FR,DE?format=arrow&filter=name,latLng')
+        self.assertEqual(response.status_code, 200)
+        table = pyarrow.ipc.open_file(pyarrow.BufferReader(response.data)).read_all()
+        self.assertEqual(table.schema.names, ["countryCode", "subdivisionCode", "name", "lat", "lng"])
+        expected = self.client.get('/api/alpha/FR').json["FR-75C"]
+        row = [row for row in table.to_pylist() if row["subdivisionCode"] == "FR-75C"][0]
+        self.assertEqual((row["name"], [row["lat"], row["lng"]]), (expected["name"], expected["latLng"]))
+
+    def test_msgpack_local(self):
+        """ Test MessagePack responses via ?format=msgpack and the Accept header, if msgpack is installed. """
+        if index.msgpack is None:
+            self.assertEqual(self.client.get('/api/alpha/FR?format=msgpack').status_code, 400)
+            self.skipTest("msgpack not installed.")
+        for url in ['/api/alpha/FR', '/api/alpha/FR,DE?filter=name', '/api/alpha/DE?lang=deu', '/api/subdivision/GB-ABD,FR-75C',
+                    '/api/search/Bayern', '/api/search/Bayern?excludeMatchScore=0', '/api/country_name/Germany', '/api/all?limit=3',
+                    '/api/all?filter=name,type', '/api/all?page=2&pageSize=3', '/api/search_geo/48.8566,2.3522', '/api/stats']:
+            expected = json.loads(self.client.get(url).data)
+            separator = "&" if "?" in url else "?"
+            response = self.client.get(url + separator + "format=msgpack")
+            self.assertEqual(response.status_code, 200, f"Expected 200 from {url}.")
+            self.assertEqual(response.mimetype, "application/msgpack")
+            self.assertEqual(msgpack.unpackb(response.data), expected, f"Expected same structure as JSON from {url}.")
+            response = self.client.get(url, headers={"Accept": "application/msgpack"})
+            self.assertEqual(msgpack.unpackb(response.data), expected, f"Expected same structure as JSON from {url}.")
+            self.assertIn("Accept", response.headers["Vary"])
+        #the full dataset is streamed from the cached per-country fragments
+        response = self.client.get('/api/all', headers={"Accept": "application/msgpack"})
+        self.assertEqual(msgpack.unpackb(response.data), self.client.get('/api/all').json)
+        self.assertNotEqual(self.client.get('/api/alpha/FR').headers["ETag"], self.client.get('/api/alpha/FR?format=msgpack').headers["ETag"])
+        self.assertEqual(self.client.get('/api/alpha/FR', headers={"Accept": "application/json"}).mimetype, "application/json")
+        #error and informational messages are always JSON
+        for url in ['/api/alpha/XYZ?format=msgpack', '/api/search/xqzxqzxqz?format=msgpack']:
+            response = self.client.get(url)
+            self.assertEqual(response.mimetype, "application/json")
+            self.assertTrue(response.json)
+
+    def test_search_index_local(self):
+        """ Test the n-gram indexed search returns the same results as Subdivisions.search for each likeness. """
+        subdivisions = index.get_subdivision_instance()
+        for search_term in ["Paris", "Derry,Kimpala", "Bonaire, Sint Eustatius and Saba", "Saint Georg", "zzzz"]:
+            for likeness in [100, 90, 75, 50, 0]:
+                for exclude_match_score in [True, False]:
+                    expected = subdivisions.search(search_term, likeness_score=likeness, exclude_match_score=exclude_match_score, local_other_name_search=True)
+                    results = index.search_subdivisions(search_term, likeness_score=likeness, exclude_match_score=exclude_match_score)
+                    self.assertEqual(results, expected, f"Expected same search results for {search_term} with likeness {likeness}.")
+                    if not exclude_match_score:
+                        self.assertEqual([result["subdivisionCode"] for result in results], [result["subdivisionCode"] for result in expected])
+        #candidates never exclude a name that meets the likeness score
+        term = "bavaria"
+        for likeness in [100, 85, 60]:
+            candidates = set(index.get_search_candidates(term, likeness))
+            for entry_id, (name, _, _) in enumerate(index.get_search_index()["entries"]):
+                if index.fuzz.ratio(term, name) >= likeness:
+                    self.assertIn(entry_id, candidates)
+        self.assertLess(len(index.get_search_candidates(term, 90)), 50)
+
+    def test_search_exact_match_local(self):
+        """ Test exact search terms are matched without fuzzy scoring, with the same results as Subdivisions.search. """
+        subdivisions = index.get_subdivision_instance()
+        for search_term in ["Bayern", "Île-de-France", "saint george", "Paris,Hessen"]:
+            for exclude_match_score in [True, False]:
+                expected = subdivisions.search(search_term, exclude_match_score=exclude_match_score, local_other_name_search=True)
+                with mock.patch.object(index.fuzz, "ratio", side_effect=AssertionError("fuzzy scoring used")):
+                    results = index.search_subdivisions(search_term, exclude_match_score=exclude_match_score)
+                self.assertEqual(results, expected)
+        #terms that miss the exact match still go through fuzzy scoring
+        self.assertEqual(index.search_subdivisions("Bayern,Kimpala"), subdivisions.search("Bayern,Kimpala", local_other_name_search=True))
+
+    def test_search_batch_scoring_local(self):
+        """ Test batch scoring of multiple search terms returns the same results as per-term scoring. """
+        for search_term in ["Pariss,Frankfurt,Rimini,Derry,Kimpala", "Bavaria,Bavaria,Ohio"]:
+            for likeness in [100, 80, 50]:
+                results = index.search_subdivisions(search_term, likeness_score=likeness, exclude_match_score=False)
+                index.search_cache.clear()
+                with mock.patch.object(index, "numpy", None):
+                    self.assertEqual(results, index.search_subdivisions(search_term, likeness_score=likeness, exclude_match_score=False))
+                self.assertEqual(results, index.get_subdivision_instance().search(search_term, likeness_score=likeness, exclude_match_score=False, local_other_name_search=True))
+
+    def test_search_cache_local(self):
+        """ Test search match scores, including empty results, are cached by their normalized terms and likeness score. """
+        results = index.search_subdivisions("Bayern, hessen,Bayern", likeness_score=90)
+        with mock.patch.object(index, "score_search_terms", side_effect=AssertionError("search rescored")):
+            self.assertEqual(index.search_subdivisions("bayern,Hessen", likeness_score=90), results)
+            self.assertEqual(index.search_cache.hits, 1)
+            #the match score and pages of a search are built from the same cached scores
+            ranked_results = index.search_subdivisions("Bayern,Hessen", likeness_score=90, exclude_match_score=False)
+            self.assertNotEqual(ranked_results, results)
+            self.assertEqual(index.search_subdivisions("Bayern,Hessen", likeness_score=90, exclude_match_score=False, limit=1, offset=1)["data"], ranked_results[1:2])
+        self.assertEqual(index.search_subdivisions("xqzxqzxqz", likeness_score=90), {})
+        with mock.patch.object(index, "score_search_terms", side_effect=AssertionError("search rescored")):
+            self.assertEqual(index.search_subdivisions("XQZXQZXQZ", likeness_score=90), {})
+        self.assertEqual(len(index.search_cache), 2)
+        #expired entries are searched again
+        with mock.patch.object(index.time, "monotonic", return_value=index.time.monotonic() + index.SEARCH_CACHE_TTL + 1):
+            self.assertIsNone(index.search_cache.get((("xqzxqzxqz",), 90, True)))
+
+    def test_autocomplete_local(self):
+        """ Test the autocomplete endpoint returning subdivisions by name and local/other name prefix. """
+        test_request_bav = self.client.get("/api/autocomplete/bav")
+        self.assertEqual(test_request_bav.status_code, 200)
+        self.assertIn({"countryCode": "DE", "subdivisionCode": "DE-BY", "name": "Bayern", "matchedName": "Bavaria"}, test_request_bav.json)
+        test_request_zur = self.client.get("/api/autocomplete/ZUR?country=CH")
+        self.assertEqual(test_request_zur.json, [{"countryCode": "CH", "subdivisionCode": "CH-ZH", "name": "Zürich", "matchedName": "Zurich"}])
+        test_request_baden = self.client.get("/api/autocomplete/Baden%20W?country=DEU")
+        self.assertEqual([result["subdivisionCode"] for result in test_request_baden.json], ["DE-BW"])
+        test_request_limit = self.client.get("/api/autocomplete/s?limit=25")
+        self.assertEqual(len(test_request_limit.json), 25)
+        self.assertEqual(len({result["subdivisionCode"] for result in test_request_limit.json}), 25)
+        self.assertTrue(all(index.normalize_autocomplete_name(result["matchedName"]).startswith("s") for result in test_request_limit.json))
+        test_request_countries = self.client.get("/api/autocomplete/a?country=FR,DE&limit=100")
+        self.assertTrue(test_request_countries.json)
+        self.assertTrue(all(result["countryCode"] in ("FR", "DE") for result in test_request_countries.json))
+        self.assertEqual(self.client.get("/api/autocomplete/xqzxqz").json, [])
+        for invalid_url in ["", "%20", "a?limit=0", "a?limit=abc", f"a?limit={index.AUTOCOMPLETE_MAX_LIMIT + 1}", "a?country=XX"]:
+            self.assertEqual(self.client.get("/api/autocomplete/" + invalid_url).status_code, 400, invalid_url)
+
+    def test_country_name_resolver_local(self):
+        """ Test country names, aliases and codes resolved via the country name resolver index. """
+        for name, alpha2 in [("Sweden", "SE"), ("swede", "SE"), ("Bolivia", "BO"), ("DR Congo", "CD"), ("French Republic", "FR"),
+                             ("Federal Republic of Nigeria", "NG"), ("US", "US"), ("deu", "DE"), ("276", "DE"), ("Côte d'Ivoire", "CI"),
+                             ("UK", "GB"), ("Great Britain", "GB"), ("Britain", "GB")]:
+            self.assertEqual(index.resolve_country_name(name), alpha2, name)
+        self.assertIsNone(index.resolve_country_name("Xyzzyqq"))
+        #unknown codes aren't fuzzy matched to the country with the most similar code
+        for code in ["UKK", "ZZ", "XKX"]:
+            self.assertIsNone(index.resolve_country_name(code), code)
+        self.assertEqual(self.client.get("/api/country_name/ZZ").status_code, 400)
+        test_request = self.client.get("/api/country_name/Germany,FRA,Ivory%20Coast")
+        self.assertEqual(test_request.status_code, 200)
+        self.assertEqual(sorted(test_request.json), ["CI", "DE", "FR"])
+        self.assertEqual(self.client.get("/api/country_name/Xyzzyqq").status_code, 400)
+
+    def test_search_bktree_candidates_local(self):
+        """ Test the BK-tree candidates include every search index entry meeting the likeness score. """
+        entries = index.get_search_index()["entries"]
+        for term in ["bavria", "derry", "kimpala", "saintgeorge", "rhenanie-du-nord-westphalie"]:
+            for likeness in [100, 95, 90, 85, 70]:
+                matches = [entry_id for entry_id, entry in enumerate(entries) if index.fuzz.ratio(term, entry[0]) >= likeness]
+                candidates = index.get_bktree_candidates(term, likeness)
+                self.assertEqual([entry_id for entry_id in candidates if index.fuzz.ratio(term, entries[entry_id][0]) >= likeness], matches)
+
+    def test_search_limit_offset_local(self):
+        """ Test the pages of search results selected via the limit and offset query string parameters. """
+        all_results = self.client.get("/api/search/Saint?likeness=50&excludeMatchScore=0").json
+        for offset in [0, 5, len(all_results) - 2]:
+            test_request = self.client.get(f"/api/search/Saint?likeness=50&excludeMatchScore=0&limit=5&offset={offset}")
+            self.assertEqual(test_request.status_code, 200)
+            self.assertEqual(test_request.json["totalMatches"], len(all_results))
+            self.assertEqual((test_request.json["limit"], test_request.json["offset"]), (5, offset))
+            self.assertEqual(test_request.json["data"], all_results[offset:offset + 5])
+        test_request_grouped = self.client.get("/api/search/Saint?likeness=50&limit=3&filter=name")
+        self.assertEqual(sum(len(subdivisions) for subdivisions in test_request_grouped.json["data"].values()), 3)
+        self.assertEqual({code for subdivisions in test_request_grouped.json["data"].values() for code in subdivisions},
+                         {result["subdivisionCode"] for result in all_results[:3]})
+        self.assertEqual(self.client.get("/api/search/Saint?likeness=50&offset=100000").json["data"], {})
+        test_request_csv = self.client.get("/api/search/Saint?likeness=50&limit=5&offset=5&format=csv")
+        self.assertEqual(test_request_csv.status_code, 200)
+        self.assertEqual((test_request_csv.headers["X-Total-Count"], test_request_csv.headers["X-Limit"], test_request_csv.headers["X-Offset"]),
+                         (str(len(all_results)), "5", "5"))
+        self.assertNotIn("X-Total-Count", self.client.get("/api/search/Saint?likeness=50&format=csv").headers)
+        for invalid_params in ["limit=0", f"limit={index.SEARCH_MAX_LIMIT + 1}", "limit=abc", "offset=-1", "offset=abc"]:
+            self.assertEqual(self.client.get(f"/api/search/Saint?{invalid_params}").status_code, 400, invalid_params)
+
+    def test_byte_size_lru_cache_threads_local(self):
+        """ Test the byte-size LRU cache stays consistent when read and written from multiple threads. """
+        cache = index.ByteSizeLRUCache(100)
+        def worker(seed: int) -> None:
+            for i in range(2000):
+                key = (seed * i) % 50
+                if cache.get(key) is None:
+                    cache.set(key, b"x" * 10, 10)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(worker, range(1, 9)))
+        self.assertLessEqual(cache.current_bytes, 100)
+        self.assertEqual(cache.current_bytes, 10 * len(cache))
+        self.assertEqual(cache.hits + cache.misses, 8 * 2000)
+
+    def test_ttl_lru_cache_threads_local(self):
+        """ Test the TTL LRU cache stays consistent when entries expire and are evicted from multiple threads. """
+        cache = index.TTLLRUCache(20, 0.001)
+        def worker(seed: int) -> None:
+            for i in range(2000):
+                key = (seed * i) % 50
+                if cache.get(key) is None:
+                    cache.set(key, [])
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(worker, range(1, 9)))
+        self.assertLessEqual(len(cache), 20)
+        self.assertEqual(cache.hits + cache.misses, 8 * 2000)